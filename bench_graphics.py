@@ -0,0 +1,539 @@
+"""
+Benchmarks for graphics.py and the game loops. Runs on the headless
+backend unless GRAPHICS_BACKEND is set, so it needs no display (set
+GRAPHICS_BACKEND=tk under Xvfb to time real Tk drawing).
+
+Usage: python bench_graphics.py [--json FILE] [--baseline FILE] [--tolerance T]
+       python bench_graphics.py --imports
+       python bench_graphics.py --jitter [--load N]
+
+With no options, prints how undraw and click resolution scale with the
+number of objects.
+
+--json runs the suite of hot paths and writes the results to FILE.
+
+--baseline compares the suite against a file written earlier by --json
+and exits with status 1 if any benchmark got more than T times slower
+(1.5 by default). Each benchmark is timed by the median of several
+runs, the limit is raised by the spread between those runs, and a
+benchmark only counts as slower if it still is when run again.
+
+--imports checks that the game modules import within IMPORT_BUDGET
+without loading tkinter, and exits with status 1 if one does not.
+
+--jitter measures how late after() timers set the way the game sets
+them fire, with N processes keeping the CPUs busy meanwhile, and exits
+with status 1 if the 99th percentile is over JITTER_BUDGET. Jitter
+only means anything on the tk backend.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('GRAPHICS_BACKEND', 'headless')
+
+from graphics import *
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEADS = ['trump.gif', 'obama.gif', 'hillary.gif', 'bernie.gif', 'carson.gif', 'pence.gif']
+IMPORT_BUDGET = 0.05  # seconds; scripts that only import the game should start at once
+JITTER_BUDGET = 0.002  # seconds; heads should time out within this of their deadline
+IMPORT_MODULES = ['graphics', 'wack_engine', 'wack_atlas', 'wack_interface', 'wack_replay', 'wack_scores',
+                  'wack_game']
+
+
+def median_of(run, repeat=7):
+    """
+    Calls run() repeat times with garbage collection off, as timeit
+    does.
+    :param run: function returning seconds per operation
+    :return: median seconds per operation, and the spread between
+             the middle half of the runs as a fraction of the median
+    """
+    gc.disable()
+    try:
+        times = sorted(run() for i in range(repeat))
+    finally:
+        gc.enable()
+    median = times[len(times) // 2]
+    return median, (times[len(times) * 3 // 4] - times[len(times) // 4]) / median
+
+
+def filled_window(n):
+    """
+    :return: window and the n small rectangles drawn in it
+    """
+    win = GraphWin('bench', 800, 800, autoflush=False)
+    shapes = [Rectangle(Point(i % 800, i // 800), Point(i % 800 + 5, i // 800 + 5)) for i in range(n)]
+    for shape in shapes:
+        shape.draw(win)
+    return win, shapes
+
+
+def bench_undraw(n, samples=2000):
+    """
+    Times undrawing (and redrawing, to keep the scene size fixed) random
+    objects in a window holding n drawn objects.
+    :param n: number of objects in the window
+    :param samples: number of undraw/draw pairs to time
+    :return: average seconds per undraw
+    """
+    win, shapes = filled_window(n)
+    rng = random.Random(n)
+    picks = [rng.choice(shapes) for i in range(samples)]
+    undraw_time = 0.0
+    gc.disable()  # as timeit does; collections would swamp the timings
+    for shape in picks:
+        start = time.perf_counter()
+        shape.undraw()
+        undraw_time += time.perf_counter() - start
+        shape.draw(win)
+    gc.enable()
+    win.close()
+    return undraw_time / samples
+
+
+def bench_draw(n, samples=2000):
+    """
+    Times drawing objects into a window holding n drawn objects, the
+    counterpart of bench_undraw.
+    :return: average seconds per draw
+    """
+    win, shapes = filled_window(n)
+    rng = random.Random(n)
+    picks = [rng.choice(shapes) for i in range(samples)]
+    draw_time = 0.0
+    for shape in picks:
+        shape.undraw()
+        start = time.perf_counter()
+        shape.draw(win)
+        draw_time += time.perf_counter() - start
+    win.close()
+    return draw_time / samples
+
+
+def bench_hit_test(n, samples=20000):
+    """
+    Times resolving clicks against n button-sized targets laid out in
+    a grid filling an 800x800 window.
+    :param n: number of targets
+    :param samples: number of clicks to time
+    :return: average seconds per click
+    """
+    win = GraphWin('bench', 800, 800, autoflush=False)
+    side = int(n ** 0.5 + 0.999)
+    size = 800 / side
+    for i in range(n):
+        x, y = i % side * size, i // side * size
+        win.addTarget(i, Point(x, y), Point(x + size * 0.8, y + size * 0.8))
+    rng = random.Random(n)
+    clicks = [Point(rng.uniform(0, 800), rng.uniform(0, 800)) for i in range(samples)]
+    start = time.perf_counter()
+    for click in clicks:
+        win.targetAt(click)
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed / samples
+
+
+def bench_reconfig(samples=20000):
+    """
+    Times changing the fill of a drawn object (GraphicsObject._reconfig).
+    :return: average seconds per change
+    """
+    win, shapes = filled_window(100)
+    shape = shapes[50]
+    colors = ['red', 'blue'] * (samples // 2)
+    start = time.perf_counter()
+    for color in colors:
+        shape.setFill(color)
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed / samples
+
+
+def bench_text_update(samples=20000):
+    """
+    Times setting the text of a drawn Text, as the score display does.
+    :return: average seconds per update
+    """
+    win = GraphWin('bench', 800, 800, autoflush=False)
+    text = Text(Point(400, 175), '')
+    text.draw(win)
+    labels = ['Current level: 1\nCurrent score: {}'.format(i) for i in range(samples)]
+    start = time.perf_counter()
+    for label in labels:
+        text.setText(label)
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed / samples
+
+
+def bench_image_load(cached, rounds=50):
+    """
+    Times making an Image of each of the bundled head GIFs.
+    :param cached: True to time loads served from Image.fileCache,
+            False to empty the cache before each load
+    :return: average seconds per Image
+    """
+    files = [os.path.join(HERE, name) for name in HEADS]
+    for name in files:
+        Image.loadFile(name)
+    elapsed = 0.0
+    for i in range(rounds):
+        for name in files:
+            if not cached:
+                Image.fileCache.clear()
+            start = time.perf_counter()
+            Image(Point(400, 400), name)
+            elapsed += time.perf_counter() - start
+    return elapsed / (rounds * len(files))
+
+
+def bench_redraw(n, samples=20):
+    """
+    Times GraphWin.redraw, which setCoords does, with n objects drawn.
+    :return: average seconds per redraw
+    """
+    win, shapes = filled_window(n)
+    start = time.perf_counter()
+    for i in range(samples):
+        win.redraw()
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed / samples
+
+
+def bench_click_dispatch(samples=20000):
+    """
+    Times a click injected into the window through GraphWin's mouse
+    handler to the game's buttons, as the game screens handle clicks.
+    :return: average seconds per click
+    """
+    from wack_interface import Button
+    win = GraphWin('bench', 800, 800, autoflush=False)
+    for i in range(6):
+        Button(Point(90 + 105 * i, 150), 100, 50, 'white', str(i), 'black', 12).draw(win)
+    hits = []
+    win.setMouseHandler(lambda click: hits.append(win.targetAt(click)))
+    rng = random.Random(0)
+    clicks = [(rng.uniform(0, 800), rng.uniform(100, 250)) for i in range(samples)]
+    click = win.injectClick
+    start = time.perf_counter()
+    for x, y in clicks:
+        click(x, y)
+    elapsed = time.perf_counter() - start
+    win.close()
+    return elapsed / samples
+
+
+def bench_score_add(samples=2000):
+    """
+    Times queueing finished games on a high score store, which is all
+    the game itself waits for; the writer thread saves them meanwhile.
+    :return: average seconds per score
+    """
+    import shutil
+    import tempfile
+    from wack_scores import ScoreStore
+    directory = tempfile.mkdtemp()
+    try:
+        scores = ScoreStore(os.path.join(directory, 'scores.db'))
+        start = time.perf_counter()
+        for i in range(samples):
+            scores.add('Donald Trump', 'play', i % 80, i % 10 + 1)
+        elapsed = time.perf_counter() - start
+        scores.close()
+    finally:
+        shutil.rmtree(directory)
+    return elapsed / samples
+
+
+def bench_simulation(games=3):
+    """
+    Times whole animated bot games (SimulationInterface.play). On the
+    headless backend pauses take no real time, so this is the cost of
+    the game loop and drawing alone.
+    :return: average seconds per game
+    """
+    from wack_engine import UniformSampler, WackEngine
+    from wack_interface import SimulationInterface
+    politician = ('Donald Trump', 'indianred', 'him', os.path.join(HERE, 'trump.gif'))
+    elapsed = 0.0
+    for i in range(games):
+        engine = WackEngine(UniformSampler(random.Random(i)))
+        start = time.perf_counter()
+        SimulationInterface(politician, engine=engine).play()
+        elapsed += time.perf_counter() - start
+    return elapsed / games
+
+
+def bench_heads(k):
+    """
+    Times a whole game on the game screen with up to k heads up at
+    once on a 10 x 8 board, 8 x k heads popping in each level. The
+    engine is driven through tick() on a made-up clock that moves on
+    one head spacing at a time, and each head is hit just before it
+    would time out, so k heads stay up through every level. The time
+    per pop should stay about the same as k grows, since heads are
+    reused and the sampler only looks at the holes that are taken.
+    :param k: most heads up at once
+    :return: average seconds per pop, hit included
+    """
+    from wack_engine import POPS_PER_LEVEL, Board, UniformSampler, WackEngine
+    from wack_interface import GameInterface
+    politician = ('Donald Trump', 'indianred', 'him', os.path.join(HERE, 'trump.gif'))
+    board = Board(10, 8)
+    game = WackEngine(UniformSampler(random.Random(k), board), board=board, heads=k,
+                      pops=POPS_PER_LEVEL * k)
+    screen = GameInterface(politician, engine=game)
+    now = 0.0
+    pops = 0
+    gc.disable()
+    start = time.perf_counter()
+    while not game.over:
+        now += game.schedule[game.level][1]
+        game.next_time()  # drops the deadlines of heads already hit
+        deadlines = game.deadlines  # a new list each level
+        while deadlines and deadlines[0][0] <= now:
+            game.hit(deadlines[0][1])
+            game.next_time()
+        game.tick(now)
+        if game.level_done():
+            pops += game.pops_per_level
+            game.next_level()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    screen.win.close()
+    return elapsed / pops
+
+
+SUITE = [
+    ('draw[1000]', lambda: bench_draw(1000)),
+    ('undraw[1000]', lambda: bench_undraw(1000)),
+    ('reconfig', bench_reconfig),
+    ('text_update', bench_text_update),
+    ('image_load', lambda: bench_image_load(False)),
+    ('image_load_cached', lambda: bench_image_load(True)),
+    ('redraw[1000]', lambda: bench_redraw(1000)),
+    ('hit_test[1000]', lambda: bench_hit_test(1000)),
+    ('click_dispatch', bench_click_dispatch),
+    ('simulation_play', bench_simulation),
+    ('heads[1]', lambda: bench_heads(1)),
+    ('heads[48]', lambda: bench_heads(48)),
+    ('score_add', bench_score_add),
+]
+
+
+def run_suite(names=None):
+    """
+    :param names: benchmarks to run, all of them if not given
+    :return: dictionary from benchmark name to median seconds per
+             operation, and the same for the spread between repeats
+    """
+    results = {}
+    spread = {}
+    for name, run in SUITE:
+        if names is None or name in names:
+            results[name], spread[name] = median_of(run)
+    return results, spread
+
+
+def compare(results, baseline, tolerance, noise=None):
+    """
+    Prints each benchmark next to its baseline.
+    :param results: dictionary from name to seconds, as from run_suite
+    :param baseline: the same for an earlier run
+    :param tolerance: slowdown ratio counted as a regression
+    :param noise: dictionary from name to how much more slowdown to
+            allow for the spread between repeats, if any
+    :return: list of names of benchmarks that regressed
+    """
+    noise = noise or {}
+    regressions = []
+    print('{:<20}  {:>12}  {:>12}  {:>7}  {:>7}'.format('benchmark', 'us', 'baseline us', 'ratio', 'limit'))
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if not base:
+            print('{:<20}  {:>12.2f}  {:>12}  {:>7}  {:>7}'.format(name, seconds * 1e6, '-', '-', '-'))
+            continue
+        ratio = seconds / base
+        limit = tolerance + noise.get(name, 0)
+        flag = ''
+        if ratio > limit:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:<20}  {:>12.2f}  {:>12.2f}  {:>7.2f}  {:>7.2f}{}'.format(
+            name, seconds * 1e6, base * 1e6, ratio, limit, flag))
+    return regressions
+
+
+def check_baseline(results, spread, baseline, tolerance):
+    """
+    Compares the suite against a baseline, allowing for the spread
+    both runs saw between repeats. Benchmarks that look slower are
+    run again, and only count as regressions if they still are.
+    :param results: medians, as from run_suite
+    :param spread: spreads, as from run_suite
+    :param baseline: the contents of a file written by --json
+    :return: list of names of benchmarks that regressed
+    """
+    base_spread = baseline.get('spread', {})
+    noise = dict((name, spread[name] + base_spread.get(name, 0)) for name in results)
+    suspects = compare(results, baseline['results'], tolerance, noise)
+    if not suspects:
+        return []
+    print()
+    print('running {} again'.format(', '.join(suspects)))
+    results, spread = run_suite(suspects)
+    noise = dict((name, spread[name] + base_spread.get(name, 0)) for name in results)
+    return compare(results, baseline['results'], tolerance, noise)
+
+
+def time_import(module, repeat=3):
+    """
+    Imports module in fresh interpreters, on the tk backend with no
+    display, as a script importing the game would.
+    :return: fewest seconds the import took, and whether it loaded tkinter
+    """
+    env = dict(os.environ)
+    env.pop('DISPLAY', None)
+    env.pop('GRAPHICS_BACKEND', None)
+    code = ('import sys, time\n'
+            'start = time.perf_counter()\n'
+            'import {}\n'
+            'print(time.perf_counter() - start, "tkinter" in sys.modules)').format(module)
+    times = []
+    for i in range(repeat):
+        seconds, tk_loaded = subprocess.check_output([sys.executable, '-c', code], cwd=HERE, env=env).split()
+        times.append(float(seconds))
+    return min(times), tk_loaded == b'True'
+
+
+def check_imports(budget=IMPORT_BUDGET):
+    """
+    Prints how long each game module takes to import.
+    :return: True if all of them import within budget seconds
+             without loading tkinter
+    """
+    ok = True
+    print('{:<16}  {:>8}  {}'.format('module', 'ms', ''))
+    for module in IMPORT_MODULES:
+        seconds, tk_loaded = time_import(module)
+        problems = []
+        if seconds > budget:
+            problems.append('OVER BUDGET')
+        if tk_loaded:
+            problems.append('LOADS TKINTER')
+        ok = ok and not problems
+        print('{:<16}  {:>8.1f}  {}'.format(module, seconds * 1e3, ' '.join(problems)))
+    return ok
+
+
+def measure_jitter(samples=500, rng=None):
+    """
+    Chains samples after() timers with random delays of 1 to 50 ms,
+    each set from clock() and rounded up to whole milliseconds as
+    GameInterface.tick does, and measures how late each one fires.
+    :param rng: random number generator for the delays, the same
+            seeded one every call if not given
+    :return: sorted list of seconds late
+    """
+    rng = rng or random.Random(0)
+    win = GraphWin('bench', 200, 200)
+    lateness = []
+    due = []
+
+    def fire():
+        lateness.append(clock() - due[0])
+        if len(lateness) == samples:
+            win.stopWaiting()
+            return
+        due[0] = clock() + rng.uniform(0.001, 0.05)
+        win.after(max(0, math.ceil((due[0] - clock()) * 1000)), fire)
+
+    due.append(clock())
+    win.after(0, fire)
+    win.wait()
+    win.close()
+    return sorted(lateness)
+
+
+def check_jitter(load=0, budget=JITTER_BUDGET):
+    """
+    Prints how late timers fire, with load busy processes running.
+    :return: True if the 99th percentile is within budget seconds
+    """
+    busy = [subprocess.Popen([sys.executable, '-c', 'while True: pass']) for i in range(load)]
+    try:
+        lateness = measure_jitter()
+    finally:
+        for process in busy:
+            process.kill()
+            process.wait()
+    p99 = lateness[int(len(lateness) * 0.99)]
+    print('backend {}, {} busy processes, {} timers'.format(getBackend().name, load, len(lateness)))
+    print('{:>8}  {:>8}  {:>8}  {:>8}'.format('ms late', 'median', 'p99', 'max'))
+    print('{:>8}  {:>8.3f}  {:>8.3f}  {:>8.3f}{}'.format(
+        '', lateness[len(lateness) // 2] * 1e3, p99 * 1e3, lateness[-1] * 1e3,
+        '  OVER BUDGET' if p99 > budget else ''))
+    return p99 <= budget
+
+
+def print_scaling():
+    print('{:>8}  {:>14}'.format('items', 'us per undraw'))
+    for n in (10, 100, 1000, 10000):
+        print('{:>8}  {:>14.2f}'.format(n, bench_undraw(n) * 1e6))
+    print()
+    print('{:>8}  {:>14}'.format('targets', 'us per click'))
+    for n in (10, 100, 1000, 10000):
+        print('{:>8}  {:>14.2f}'.format(n, bench_hit_test(n) * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for graphics.py and the game loops.')
+    parser.add_argument('--json', metavar='FILE', help='run the suite and write the results to FILE')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the suite against results in FILE')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='slowdown ratio counted as a regression (default 1.5)')
+    parser.add_argument('--imports', action='store_true',
+                        help='check the game modules import within the time budget')
+    parser.add_argument('--jitter', action='store_true',
+                        help='check how late timers fire against the jitter budget')
+    parser.add_argument('--load', type=int, default=0, metavar='N',
+                        help='busy processes to run during --jitter (default 0)')
+    args = parser.parse_args()
+    if args.imports:
+        sys.exit(0 if check_imports() else 1)
+    if args.jitter:
+        sys.exit(0 if check_jitter(args.load) else 1)
+    if not args.json and not args.baseline:
+        print_scaling()
+        return
+    results, spread = run_suite()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'backend': getBackend().name,
+                       'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'unit': 'median seconds per operation',
+                       'results': results,
+                       'spread': spread}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if check_baseline(results, spread, baseline, args.tolerance):
+            sys.exit(1)
+    else:
+        compare(results, {}, args.tolerance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Builds the sprite atlas of politician heads: every head GIF scaled to
+the same height and packed side by side into heads.png, with the GIFs'
+transparency kept as an alpha channel, and heads.json giving where each
+one is. The game loads the atlas once instead of reading a file per
+politician; run this again after adding or changing a head.
+
+Usage: python build_atlas.py
+
+Needs nothing beyond the standard library: the GIFs are decoded and
+the PNG written here, so no display or Tk is needed either.
+"""
+import json
+import os
+import struct
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEADS = ['trump.gif', 'carson.gif', 'hillary.gif', 'bernie.gif', 'obama.gif', 'pence.gif']
+HEAD_HEIGHT = 108  # pixels; the height of the smallest head, so none is enlarged
+ATLAS_IMAGE = 'heads.png'
+ATLAS_INDEX = 'heads.json'
+
+
+def lzw_decode(data, min_code_size, count):
+    """
+    Decodes GIF image data.
+    :param data: LZW compressed bytes, with the sub-block lengths removed
+    :param min_code_size: LZW minimum code size from the image block
+    :param count: number of pixels in the image
+    :return: bytearray of color indices
+    """
+    clear = 1 << min_code_size
+    end = clear + 1
+    out = bytearray()
+    bits = 0
+    bit_count = 0
+    code_size = min_code_size + 1
+    table = [bytes([i]) for i in range(clear)] + [b'', b'']
+    previous = None
+    for byte in data:
+        bits |= byte << bit_count
+        bit_count += 8
+        while bit_count >= code_size:
+            code = bits & ((1 << code_size) - 1)
+            bits >>= code_size
+            bit_count -= code_size
+            if code == clear:
+                table = table[:clear + 2]
+                code_size = min_code_size + 1
+                previous = None
+                continue
+            if code == end:
+                return out[:count]
+            if code < len(table):
+                entry = table[code]
+                if previous is not None:
+                    table.append(previous + entry[:1])
+            else:  # the code being defined right now
+                entry = previous + previous[:1]
+                table.append(entry)
+            out += entry
+            previous = entry
+            if len(table) == 1 << code_size and code_size < 12:
+                code_size += 1
+    return out[:count]
+
+
+def read_gif(filename):
+    """
+    Reads the first image of a GIF file.
+    :return: width, height and a list of rows, each a list of
+             (r, g, b, alpha)
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data[:3] != b'GIF':
+        raise ValueError('not a GIF file: ' + filename)
+    flags = data[10]
+    pos = 13
+    palette = None
+    if flags & 0x80:
+        size = 3 << ((flags & 7) + 1)
+        palette = data[pos:pos + size]
+        pos += size
+    transparent = None
+    while data[pos] == 0x21:  # extension blocks
+        if data[pos + 1] == 0xF9 and data[pos + 3] & 1:  # graphic control, with transparency
+            transparent = data[pos + 6]
+        pos += 2
+        while data[pos]:
+            pos += data[pos] + 1
+        pos += 1
+    if data[pos] != 0x2C:
+        raise ValueError('no image in ' + filename)
+    width, height, image_flags = struct.unpack_from('<4xHHB', data, pos + 1)
+    pos += 10
+    if image_flags & 0x80:
+        size = 3 << ((image_flags & 7) + 1)
+        palette = data[pos:pos + size]
+        pos += size
+    min_code_size = data[pos]
+    pos += 1
+    compressed = bytearray()
+    while data[pos]:
+        compressed += data[pos + 1:pos + 1 + data[pos]]
+        pos += data[pos] + 1
+    indices = lzw_decode(compressed, min_code_size, width * height)
+    colors = [tuple(palette[3 * i:3 * i + 3]) + (255,) for i in range(len(palette) // 3)]
+    if transparent is not None and transparent < len(colors):
+        colors[transparent] = (0, 0, 0, 0)
+    rows = [[colors[i] for i in indices[y * width:(y + 1) * width]] for y in range(height)]
+    if image_flags & 0x40:  # interlaced: rows are stored in four passes
+        order = [y for start, step in ((0, 8), (4, 8), (2, 4), (1, 2)) for y in range(start, height, step)]
+        interlaced = rows
+        rows = [None] * height
+        for stored, y in enumerate(order):
+            rows[y] = interlaced[stored]
+    return width, height, rows
+
+
+def scale(rows, width, height, new_width, new_height):
+    """
+    Shrinks an image by averaging the source pixels under each new one,
+    weighting their colors by how opaque they are.
+    :return: list of new rows of (r, g, b, alpha)
+    """
+    new_rows = []
+    for y in range(new_height):
+        top = y * height // new_height
+        bottom = max((y + 1) * height // new_height, top + 1)
+        row = []
+        for x in range(new_width):
+            left = x * width // new_width
+            right = max((x + 1) * width // new_width, left + 1)
+            pixels = [rows[j][i] for j in range(top, bottom) for i in range(left, right)]
+            alpha = sum(pixel[3] for pixel in pixels)
+            if alpha:
+                color = tuple(sum(pixel[k] * pixel[3] for pixel in pixels) // alpha for k in range(3))
+                row.append(color + (alpha // len(pixels),))
+            else:
+                row.append((0, 0, 0, 0))
+        new_rows.append(row)
+    return new_rows
+
+
+def write_png(filename, width, height, rows):
+    """
+    Writes an image with an alpha channel to a PNG file.
+    """
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body) & 0xffffffff)
+    raw = bytearray()
+    for row in rows:
+        raw.append(0)  # no filter
+        for pixel in row:
+            raw.extend(pixel)
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(bytes(raw), 9)))
+        f.write(chunk(b'IEND', b''))
+
+
+def build(heads=HEADS, head_height=HEAD_HEIGHT, directory=HERE):
+    """
+    Builds the atlas from the head GIFs in directory.
+    :return: the index, from GIF file name to (x, y, width, height)
+             of that head in the atlas image
+    """
+    sprites = []
+    for name in heads:
+        width, height, rows = read_gif(os.path.join(directory, name))
+        new_width = max(1, round(width * head_height / height))
+        if height > head_height:
+            rows = scale(rows, width, height, new_width, head_height)
+        else:
+            new_width = width
+        sprites.append((name, new_width, min(height, head_height), rows))
+    atlas_width = sum(width for name, width, height, rows in sprites)
+    atlas_height = max(height for name, width, height, rows in sprites)
+    clear = (0, 0, 0, 0)
+    atlas = [[clear] * atlas_width for y in range(atlas_height)]
+    index = {}
+    x = 0
+    for name, width, height, rows in sprites:
+        for y in range(height):
+            atlas[y][x:x + width] = rows[y]
+        index[name] = (x, 0, width, height)
+        x += width
+    write_png(os.path.join(directory, ATLAS_IMAGE), atlas_width, atlas_height, atlas)
+    with open(os.path.join(directory, ATLAS_INDEX), 'w') as f:
+        json.dump({'image': ATLAS_IMAGE, 'sprites': index}, f, indent=2, sort_keys=True)
+    return index
+
+
+if __name__ == '__main__':
+    for name, region in sorted(build().items()):
+        print(name, region)
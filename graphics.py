@@ -67,6 +67,47 @@ __version__ = "5.0"
 #     mouse button number as tuple
 #
 
+# Local changes for Wack-A-Politician:
+#  * added wait and stopWaiting to GraphWin so callers can block on
+#     mouse handlers and after() timers instead of polling checkMouse
+#  * added pluggable rendering backends (setBackend, GRAPHICS_BACKEND):
+#     "tk" as before, or "headless" for running without a display.
+#     GraphWin now wraps the backend canvas instead of subclassing
+#     tk.Canvas, and no Tk root is created under the headless backend.
+#  * Image keeps decoded image files in a shared LRU cache (loadFile), so
+#     creating an Image of a file that was already loaded does no I/O
+#  * added hide and show to GraphicsObject, which toggle the canvas item
+#     state instead of deleting and recreating the item
+#  * added commitFrame to GraphWin for autoflush=False windows; it only
+#     redraws (update_idletasks) and leaves input to wait() and update()
+#  * GraphWin.items is an OrderedDict, so undraw no longer scans a list
+#  * added clock(), the backend's notion of the current time
+#  * added HitIndex and GraphWin.addTarget/removeTarget/targetAt for
+#     resolving a click against many clickable rectangles at once
+#  * added Circles, many circles handled as one tagged object; the
+#     headless canvas accepts tags wherever it accepts item ids
+#  * added Recorder (setRecorder, GRAPHICS_RECORD), an optional ring
+#     buffer of timings from update, draw, undraw, checkMouse and
+#     commitFrame; with no recorder set each hook is one global test
+#  * added setClickListener and injectClick to GraphWin, for recording
+#     and replaying a session's clicks
+#  * added mouse, key and timer to GraphWin, which return asyncio futures;
+#     graphics_asyncio runs the backend's events from an asyncio loop
+#  * getMouse, getMouseWithButton and getKey sleep in wait_variable until
+#     input arrives instead of polling every 0.1 s, and take an optional
+#     timeout in seconds
+#  * clock() under Tk reads time.perf_counter rather than time.time, so
+#     it never jumps when the system time is changed
+#  * _reconfig sends only the option that changed to itemconfig
+#  * added Stage, one toplevel that switches between GraphWin scenes
+#     (GraphWin(..., stage=stage)), so screens can be kept and reused
+#  * tkinter is imported and the Tk root created on first use rather than
+#     at import, so scripts that only import this module need no display
+#  * Image(p, filename, (x, y, width, height)) makes an Image of part of
+#     an image file, so many sprites can share one atlas image; the
+#     cropped parts are cached by loadFile like whole files
+#
+
 # Version 5 8/26/2016
 #     * update at bottom to fix MacOS issue causing askopenfile() to hang
 #     * update takes an optional parameter specifying update rate
@@ -165,12 +206,22 @@ __version__ = "5.0"
 #     Added ability to set text atttributes.
 #     Added Entry boxes.
 
-import time, os, sys
+import time, os, sys, heapq, struct
+from array import array
+from collections import OrderedDict
+
+tk = None  # tkinter, imported by the tk backend when first needed
+_monotonic = getattr(time, "perf_counter", time.time)  # time.time on Python 2
+
 
-try:  # import as appropriate for 2.x vs. 3.x
-    import tkinter as tk
-except:
-    import Tkinter as tk
+def _importTk():
+    global tk
+    if tk is None:
+        try:  # import as appropriate for 2.x vs. 3.x
+            import tkinter as tk
+        except:
+            import Tkinter as tk
+    return tk
 
 
 ##########################################################################
@@ -185,47 +236,602 @@ OBJ_ALREADY_DRAWN = "Object currently drawn"
 UNSUPPORTED_METHOD = "Object doesn't support operation"
 BAD_OPTION = "Illegal option value"
 
+##########################################################################
+# Rendering backends
+#
+# GraphWin and the GraphicsObjects never touch tkinter directly; they ask
+# the current backend for toplevels, canvases, images and variables. The
+# "tk" backend hands out the real Tk widgets. The "headless" backend hands
+# out in-memory stand-ins with the same methods, so programs run without
+# a display. Choose one with setBackend() or the GRAPHICS_BACKEND
+# environment variable before creating any windows.
+
+class TkBackend:
+    """Backend that draws into real Tk windows. tkinter is imported and
+    the hidden Tk root made only when the first window, image or
+    variable is, so importing this module needs no display."""
+
+    name = "tk"
+
+    def __init__(self):
+        self.root = None
+
+    def rootWindow(self):
+        if self.root is None:
+            _importTk()
+            self.root = tk.Tk()
+            self.root.withdraw()
+            self.root.update()  # MacOS fix 1, as at import before
+        return self.root
+
+    def toplevel(self):
+        root = self.rootWindow()
+        return tk.Toplevel(root)
+
+    def canvas(self, master, **options):
+        return tk.Canvas(master, **options)
+
+    def photoImage(self, **options):
+        root = self.rootWindow()
+        return tk.PhotoImage(master=root, **options)
+
+    def cropPhoto(self, photo, x, y, width, height):
+        root = self.rootWindow()
+        part = tk.PhotoImage(master=root, width=width, height=height)
+        part.tk.call(part, "copy", photo, "-from", x, y, x + width, y + height)
+        return part
+
+    def stringVar(self):
+        root = self.rootWindow()
+        return tk.StringVar(root)
+
+    def intVar(self, value=0):
+        root = self.rootWindow()
+        return tk.IntVar(root, value)
+
+    def frame(self, master):
+        return tk.Frame(master)
+
+    def entry(self, master, **options):
+        return tk.Entry(master, **options)
+
+    def update(self):
+        if self.root is not None:
+            self.root.update()
+
+    def time(self):
+        return _monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class _Event:
+    # Stand-in for a Tk event, for input that does not come from Tk.
+
+    def __init__(self, x=0, y=0, num=1, keysym=""):
+        self.x = x
+        self.y = y
+        self.num = num
+        self.keysym = keysym
+
+
+class _HeadlessWidget:
+    # Minimal widget: keeps its configuration and ignores geometry calls.
+
+    def __init__(self, backend, master=None, **options):
+        self.backend = backend
+        self.master = master
+        self.options = dict(options)
+        self.destroyed = False
+
+    def config(self, cnf=None, **options):
+        if cnf: self.options.update(cnf)
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, option):
+        return self.options.get(option, "")
+
+    def pack(self, **options): pass
+
+    def pack_forget(self): pass
+
+    def lift(self): pass
+
+    def focus_set(self): pass
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class _HeadlessToplevel(_HeadlessWidget):
+
+    def __init__(self, backend):
+        _HeadlessWidget.__init__(self, backend)
+        self._title = ""
+        self.protocols = {}
+
+    def title(self, text=None):
+        if text is None: return self._title
+        self._title = text
+
+    def protocol(self, name, func):
+        self.protocols[name] = func
+
+    def resizable(self, width, height): pass
+
+
+class _HeadlessVar:
+    # Counts writes so waits can tell that the variable was set.
+
+    def __init__(self, value):
+        self.value = value
+        self.writes = 0
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        self.writes = self.writes + 1
+
+
+class HeadlessCanvas(_HeadlessWidget):
+    """In-memory replacement for the parts of tk.Canvas used by this
+    module. Every item that would have been drawn is recorded in
+    self.scene as id -> [type, coords, options], so the result of a run
+    can be inspected. Like Tk, item methods accept a tag in place of an
+    id and then act on every item with that tag. click() and key()
+    inject input the way a user would."""
+
+    def __init__(self, backend, master, **options):
+        _HeadlessWidget.__init__(self, backend, master, **options)
+        self.scene = {}
+        self.tagged = {}  # tag -> ids of items with that tag
+        self.bindings = {}
+        self._nextId = 1
+
+    def _create(self, kind, args, kw):
+        args = list(args)
+        options = {}
+        if args and isinstance(args[-1], dict):
+            options.update(args.pop())
+        options.update(kw)
+        itemId = self._nextId
+        self._nextId = itemId + 1
+        self.scene[itemId] = [kind, args, options]
+        for tag in self._tags(options):
+            self.tagged.setdefault(tag, []).append(itemId)
+        return itemId
+
+    def _tags(self, options):
+        tags = options.get("tags", ())
+        return (tags,) if isinstance(tags, str) else tags
+
+    def _items(self, tagOrId):
+        if tagOrId in self.scene:
+            return [self.scene[tagOrId]]
+        return [self.scene[i] for i in self.tagged.get(tagOrId, ())]
+
+    def create_line(self, *args, **kw): return self._create("line", args, kw)
+
+    def create_rectangle(self, *args, **kw): return self._create("rectangle", args, kw)
+
+    def create_oval(self, *args, **kw): return self._create("oval", args, kw)
+
+    def create_polygon(self, *args, **kw): return self._create("polygon", args, kw)
+
+    def create_text(self, *args, **kw): return self._create("text", args, kw)
+
+    def create_image(self, *args, **kw): return self._create("image", args, kw)
+
+    def create_window(self, *args, **kw): return self._create("window", args, kw)
+
+    def delete(self, *tagsOrIds):
+        for tagOrId in tagsOrIds:
+            ids = [tagOrId] if tagOrId in self.scene else self.tagged.get(tagOrId, [])[:]
+            for itemId in ids:
+                item = self.scene.pop(itemId)
+                for tag in self._tags(item[2]):
+                    tagged = self.tagged[tag]
+                    tagged.remove(itemId)
+                    if not tagged: del self.tagged[tag]
+
+    def itemconfig(self, tagOrId, cnf=None, **options):
+        for item in self._items(tagOrId):
+            if cnf: item[2].update(cnf)
+            item[2].update(options)
+
+    itemconfigure = itemconfig
+
+    def itemcget(self, tagOrId, option):
+        return self._items(tagOrId)[0][2].get(option, "")
+
+    def type(self, tagOrId):
+        return self._items(tagOrId)[0][0]
+
+    def coords(self, tagOrId, *args):
+        item = self._items(tagOrId)[0]
+        if args:
+            if len(args) == 1: args = args[0]
+            item[1] = list(args)
+        return list(item[1])
+
+    def move(self, tagOrId, dx, dy):
+        for item in self._items(tagOrId):
+            item[1] = [c + (dy if i % 2 else dx) for i, c in enumerate(item[1])]
+
+    def find_withtag(self, tagOrId):
+        if tagOrId in self.scene:
+            return (tagOrId,)
+        return tuple(self.tagged.get(tagOrId, ()))
+
+    def find_all(self):
+        return tuple(self.scene)
+
+    def bind(self, sequence, func):
+        self.bindings[sequence] = func
+
+    def bind_all(self, sequence, func):
+        self.backend.bindings[sequence] = func
+
+    def update(self):
+        self.backend.update()
+
+    def update_idletasks(self): pass
+
+    def after(self, ms, func, *args):
+        return self.backend.after(ms, func, *args)
+
+    def after_cancel(self, timerId):
+        self.backend.after_cancel(timerId)
+
+    def wait_variable(self, var):
+        self.backend.waitVariable(var)
+
+    def click(self, x, y, num=1):
+        """Deliver a mouse click at canvas position (x, y)."""
+        func = self.bindings.get("<Button-{}>".format(num))
+        if func: func(_Event(x, y, num))
+
+    def key(self, keysym):
+        """Deliver a key press."""
+        func = self.backend.bindings.get("<Key>")
+        if func: func(_Event(keysym=keysym))
+
+
+class _HeadlessPhoto:
+    # Stand-in for tk.PhotoImage. Only the size is read from GIF and PNG
+    # files; pixels that have been put are remembered for getPixel.
+
+    def __init__(self, file=None, width=0, height=0):
+        if file is not None:
+            with open(file, "rb") as f:
+                header = bytearray(f.read(24))
+            if header[:3] == bytearray(b"GIF"):
+                width = header[6] | header[7] << 8
+                height = header[8] | header[9] << 8
+            elif header[:8] == bytearray(b"\x89PNG\r\n\x1a\n"):
+                width, height = struct.unpack(">II", bytes(header[16:24]))
+            else:
+                raise GraphicsError("headless backend can only read GIF and PNG images")
+        self._width = int(width)
+        self._height = int(height)
+        self.pixels = {}
+
+    def width(self): return self._width
+
+    def height(self): return self._height
+
+    def get(self, x, y):
+        return self.pixels.get((x, y), (0, 0, 0))
+
+    def put(self, data, to):
+        color = data.strip("{}")
+        if color.startswith("#"):
+            color = tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+        self.pixels[tuple(to)] = color
+
+    def copy(self):
+        other = _HeadlessPhoto(width=self._width, height=self._height)
+        other.pixels = dict(self.pixels)
+        return other
+
+    def write(self, filename, format=None):
+        raise GraphicsError("headless images cannot be saved")
+
+
+class HeadlessBackend:
+    """Backend without a display. Drawing goes to HeadlessCanvas objects,
+    and time is virtual: sleeps and waits jump the clock straight to the
+    next after() timer instead of blocking, so programs run as fast as
+    the CPU allows."""
+
+    name = "headless"
+
+    def __init__(self):
+        self.now = 0.0
+        self.bindings = {}
+        self._timers = []
+        self._timerCount = 0
+        self._cancelled = set()
+
+    def toplevel(self):
+        return _HeadlessToplevel(self)
+
+    def canvas(self, master, **options):
+        return HeadlessCanvas(self, master, **options)
+
+    def photoImage(self, **options):
+        return _HeadlessPhoto(**options)
+
+    def cropPhoto(self, photo, x, y, width, height):
+        return _HeadlessPhoto(width=width, height=height)
+
+    def stringVar(self):
+        return _HeadlessVar("")
+
+    def intVar(self, value=0):
+        return _HeadlessVar(value)
+
+    def frame(self, master):
+        return _HeadlessWidget(self, master)
+
+    def entry(self, master, **options):
+        return _HeadlessWidget(self, master, **options)
+
+    def after(self, ms, func, *args):
+        self._timerCount = self._timerCount + 1
+        timerId = "after#{}".format(self._timerCount)
+        heapq.heappush(self._timers, (self.now + ms / 1000.0, self._timerCount,
+                                      timerId, func, args))
+        return timerId
+
+    def after_cancel(self, timerId):
+        self._cancelled.add(timerId)
+
+    def _runNext(self, limit):
+        # Run the earliest timer due by limit; return False if there is none.
+        timers = self._timers
+        while timers:
+            due, count, timerId, func, args = timers[0]
+            if due > limit: return False
+            heapq.heappop(timers)
+            if timerId in self._cancelled:
+                self._cancelled.discard(timerId)
+                continue
+            if due > self.now: self.now = due
+            func(*args)
+            return True
+        return False
+
+    def update(self):
+        while self._runNext(self.now): pass
+
+    def step(self):
+        """Run the next timer, moving the clock on to it. Returns False
+        if no timers are pending."""
+        return self._runNext(float("inf"))
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        end = self.now + seconds
+        while self._runNext(end): pass
+        if end > self.now: self.now = end
+
+    def waitVariable(self, var):
+        writes = var.writes
+        while var.writes == writes:
+            if not self._runNext(float("inf")):
+                raise GraphicsError("headless wait for input that can never arrive")
+
+
+_backends = {"tk": TkBackend, "headless": HeadlessBackend}
+_backend = None
+
+
+def setBackend(name):
+    """Select the rendering backend, "tk" or "headless". Windows and
+    images created earlier stay with the backend they were made on."""
+    global _backend, _update_lasttime
+    if name not in _backends:
+        raise GraphicsError(BAD_OPTION)
+    _backend = _backends[name]()
+    # update(rate) paces frames on the new backend's clock from here on
+    _update_lasttime = _backend.time()
+    return _backend
+
+
+def getBackend():
+    """Return the current rendering backend."""
+    return _backend
+
+
+setBackend(os.environ.get("GRAPHICS_BACKEND", "tk"))
+
 ##########################################################################
 # global variables and funtions
 
-_root = tk.Tk()
-_root.withdraw()
 
-_update_lasttime = time.time()
+def clock():
+    """Return the current time in seconds from the backend's clock. Use
+    it to time animations so they also run on the headless backend's
+    virtual clock. The clock only goes forward: under Tk it is the
+    monotonic high resolution clock, so changes to the system time do
+    not disturb timings, and only differences between readings mean
+    anything."""
+    return _backend.time()
+
+
+def _newFuture(waiting=None):
+    # asyncio is only imported by programs that await GraphWin futures.
+    import asyncio
+    future = asyncio.get_event_loop().create_future()
+    if waiting is not None:
+        waiting.append(future)
+    return future
+
+
+def _resolveFutures(futures, value):
+    # Resolve the futures still pending with value; return whether any were.
+    resolved = False
+    for future in futures:
+        if not future.done():
+            future.set_result(value)
+            resolved = True
+    del futures[:]
+    return resolved
+
+
+class Recorder:
+    """Ring buffer of timing samples, each a kind (such as "draw"), a
+    start time and a duration, in seconds on a real high resolution
+    clock even under the headless backend. Only the last capacity
+    samples are kept. Install one with setRecorder to turn on the
+    timing hooks in this module; save writes the samples out."""
+
+    clock = staticmethod(_monotonic)
+
+    def __init__(self, capacity=4096, filename=None):
+        self.capacity = capacity
+        self.filename = filename
+        self.kinds = [None] * capacity
+        self.starts = array('d', [0.0]) * capacity
+        self.durations = array('d', [0.0]) * capacity
+        self.count = 0
+        self.last = {}
+
+    def record(self, kind, start, duration):
+        i = self.count % self.capacity
+        self.kinds[i] = kind
+        self.starts[i] = start
+        self.durations[i] = duration
+        self.count = self.count + 1
+
+    def interval(self, kind):
+        """Record the time since the last interval of this kind, for
+        instance between frames. The first call only starts the clock."""
+        now = self.clock()
+        last = self.last.get(kind)
+        self.last[kind] = now
+        if last is not None:
+            self.record(kind, last, now - last)
+
+    def samples(self):
+        """Return the samples kept, oldest first, as (kind, start,
+        duration) tuples."""
+        first = max(0, self.count - self.capacity)
+        return [(self.kinds[i % self.capacity], self.starts[i % self.capacity],
+                 self.durations[i % self.capacity]) for i in range(first, self.count)]
+
+    def summary(self):
+        """Return a dictionary from kind to the number, mean and maximum
+        duration of the samples kept of that kind."""
+        totals = {}
+        for kind, start, duration in self.samples():
+            n, total, longest = totals.get(kind, (0, 0.0, 0.0))
+            totals[kind] = (n + 1, total + duration, max(longest, duration))
+        return dict((kind, {"count": n, "mean": total / n, "max": longest})
+                    for kind, (n, total, longest) in totals.items())
+
+    def save(self, filename=None):
+        """Write the samples to filename (by default the one given when
+        the recorder was made) as CSV if it ends in .csv, else as JSON
+        with a summary. Does nothing if there is no filename."""
+        filename = filename or self.filename
+        if not filename: return
+        with open(filename, "w") as f:
+            if filename.lower().endswith(".csv"):
+                import csv
+                writer = csv.writer(f)
+                writer.writerow(["kind", "start", "duration"])
+                writer.writerows(self.samples())
+            else:
+                import json
+                json.dump({"recorded": self.count,
+                           "dropped": max(0, self.count - self.capacity),
+                           "summary": self.summary(),
+                           "samples": self.samples()}, f)
 
 
-def update(rate=None):
+_recorder = None
+
+
+def setRecorder(recorder):
+    """Send timings to recorder, or stop recording if it is None.
+    Returns the recorder that was set before."""
+    global _recorder
+    previous = _recorder
+    _recorder = recorder
+    return previous
+
+
+def getRecorder():
+    """Return the current Recorder, or None if timings are not recorded."""
+    return _recorder
+
+
+if os.environ.get("GRAPHICS_RECORD"):
+    setRecorder(Recorder(filename=os.environ["GRAPHICS_RECORD"]))
+
+
+def _pace(rate):
+    # Pause as needed so that this is called at most rate times a second.
     global _update_lasttime
+    now = _backend.time()
+    pauseLength = 1 / rate - (now - _update_lasttime)
+    if pauseLength > 0:
+        _backend.sleep(pauseLength)
+        _update_lasttime = now + pauseLength
+    else:
+        _update_lasttime = now
+
+
+def update(rate=None):
     if rate:
-        now = time.time()
-        pauseLength = 1 / rate - (now - _update_lasttime)
-        if pauseLength > 0:
-            time.sleep(pauseLength)
-            _update_lasttime = now + pauseLength
-        else:
-            _update_lasttime = now
+        _pace(rate)
 
-    _root.update()
+    recorder = _recorder
+    if recorder:
+        start = recorder.clock()
+        _backend.update()
+        recorder.record("update", start, recorder.clock() - start)
+    else:
+        _backend.update()
 
 
 ############################################################################
 # Graphics classes start here
 
-class GraphWin(tk.Canvas):
-    """A GraphWin is a toplevel window for displaying graphics."""
+class GraphWin:
+    """A GraphWin is a toplevel window for displaying graphics. Drawing
+    goes to a canvas made by the current backend; Canvas methods that
+    GraphWin does not define are forwarded to that canvas."""
 
     def __init__(self, title="Graphics Window",
-                 width=200, height=200, autoflush=True):
+                 width=200, height=200, autoflush=True, stage=None):
         assert type(title) == type(""), "Title must be a string"
-        master = tk.Toplevel(_root)
-        master.protocol("WM_DELETE_WINDOW", self.close)
-        tk.Canvas.__init__(self, master, width=width, height=height,
-                           highlightthickness=0, bd=0)
-        self.master.title(title)
-        self.pack()
-        master.resizable(0, 0)
+        self.stage = stage
+        if stage:
+            # a scene: the stage owns the toplevel and packs the canvas
+            master = stage.master
+        else:
+            master = _backend.toplevel()
+            master.protocol("WM_DELETE_WINDOW", self.close)
+        self.canvas = _backend.canvas(master, width=width, height=height,
+                                      highlightthickness=0, bd=0)
+        self.master = master
+        if not stage:
+            self.master.title(title)
+            self.canvas.pack()
+            master.resizable(0, 0)
         self.foreground = "black"
-        self.items = []
+        self.items = OrderedDict()  # drawn objects, in drawing order
+        self.hitIndex = HitIndex()
         self.mouseX = None
         self.mouseY = None
         self.mouseNum = None
@@ -237,11 +843,22 @@ class GraphWin(tk.Canvas):
         self.width = int(width)
         self.autoflush = autoflush
         self._mouseCallback = None
+        self._clickListener = None
         self.trans = None
         self.closed = False
         master.lift()
         self.lastKey = ""
-        if autoflush: _root.update()
+        self._waitVar = _backend.intVar(0)
+        self._waitDone = True
+        self._waitResult = None
+        self._mouseFutures = []
+        self._keyFutures = []
+        if autoflush: self.update()
+
+    def __getattr__(self, name):
+        canvas = self.__dict__.get("canvas")
+        if canvas is None: raise AttributeError(name)
+        return getattr(canvas, name)
 
     def __repr__(self):
         if self.isClosed():
@@ -259,7 +876,10 @@ class GraphWin(tk.Canvas):
             raise GraphicsError("window is closed")
 
     def _onKey(self, evnt):
+        if self._keyFutures and _resolveFutures(self._keyFutures, evnt.keysym):
+            return
         self.lastKey = evnt.keysym
+        self._waitVar.set(1)  # wake up a pending getKey
 
     def setBackground(self, color):
         """Set background color of the window"""
@@ -278,7 +898,16 @@ class GraphWin(tk.Canvas):
 
         if self.closed: return
         self.closed = True
-        self.master.destroy()
+        if self.stage:
+            self.stage._remove(self)
+            self.canvas.destroy()
+        else:
+            self.master.destroy()
+        self._waitVar.set(1)  # wake up a pending wait
+        for future in self._mouseFutures + self._keyFutures:
+            if not future.done():
+                future.set_exception(GraphicsError("window closed while waiting"))
+        del self._mouseFutures[:], self._keyFutures[:]
         self.__autoflush()
 
     def isClosed(self):
@@ -289,7 +918,7 @@ class GraphWin(tk.Canvas):
 
     def __autoflush(self):
         if self.autoflush:
-            _root.update()
+            _backend.update()
 
     def plot(self, x, y, color="black"):
         """Set pixel (x,y) to the given color"""
@@ -310,42 +939,76 @@ class GraphWin(tk.Canvas):
         self.__checkOpen()
         self.update_idletasks()
 
-    def getMouse(self):
+    def commitFrame(self, rate=None):
+        """Show everything changed since the last frame with a single
+        redraw (update_idletasks). Intended for windows created with
+        autoflush=False. Input and timers are not handled here, so this
+        is safe to call from handlers and timers; code that animates
+        outside wait() must call update() to keep input flowing. If
+        rate is given, pauses as needed so that frames are committed at
+        most rate times per second."""
+        self.__checkOpen()
+        if _recorder: _recorder.interval("frame")
+        if rate:
+            _pace(rate)
+        self.update_idletasks()
+
+    def getMouse(self, timeout=None):
         """Wait for mouse click and return Point object representing
-        the click"""
-        self.update()  # flush any prior clicks
-        self.mouseX = None
-        self.mouseY = None
-        while self.mouseX == None or self.mouseY == None:
-            self.update()
-            if self.isClosed(): raise GraphicsError("getMouse in closed window")
-            time.sleep(.1)  # give up thread
-        x, y = self.toWorld(self.mouseX, self.mouseY)
-        self.mouseX = None
-        self.mouseY = None
-        return Point(x, y)
+        the click. If timeout is given and that many seconds pass
+        without a click, return None."""
+        click = self.getMouseWithButton(timeout)
+        return click and click[0]
 
-    def getMouseWithButton(self):
+    def getMouseWithButton(self, timeout=None):
         """Wait for mouse click and return Point object representing
-        the click"""
+        the click and the mouse button number as a tuple, or None if
+        timeout seconds pass first"""
         self.update()  # flush any prior clicks
         self.mouseX = None
         self.mouseY = None
-        while self.mouseX == None or self.mouseY == None:
-            self.update()
-            if self.isClosed(): raise GraphicsError("getMouse in closed window")
-            time.sleep(.1)  # give up thread
+        if not self.__waitForInput(lambda: self.mouseX != None and self.mouseY != None,
+                                   timeout, "getMouse"):
+            return None
         x, y = self.toWorld(self.mouseX, self.mouseY)
         self.mouseX = None
         self.mouseY = None
         return Point(x, y), self.mouseNum
 
+    def __waitForInput(self, ready, timeout, caller):
+        # Sleep in the event loop until ready() is true, waking whenever
+        # _waitVar is written (by input, close or the timeout timer).
+        # Returns False if timeout seconds passed first.
+        if self.isClosed(): raise GraphicsError(caller + " in closed window")
+        timedOut = []
+        timerId = None
+        if timeout is not None:
+            def expire():
+                timedOut.append(True)
+                self._waitVar.set(1)
+            timerId = self.after(int(timeout * 1000), expire)
+        try:
+            while not ready():
+                if timedOut: return False
+                self.wait_variable(self._waitVar)
+                if self.isClosed(): raise GraphicsError(caller + " in closed window")
+        finally:
+            if timerId and not timedOut and not self.closed:
+                self.after_cancel(timerId)
+        return True
+
     def checkMouse(self):
         """Return last mouse click or None if mouse has
         not been clicked since last call"""
         if self.isClosed():
             raise GraphicsError("checkMouse in closed window")
-        self.update()
+        recorder = _recorder
+        if recorder:
+            start = recorder.clock()
+            self.update()
+            recorder.record("checkMouse", start, recorder.clock() - start)
+        else:
+            self.update()
         if self.mouseX != None and self.mouseY != None:
             x, y = self.toWorld(self.mouseX, self.mouseY)
             self.mouseX = None
@@ -354,18 +1017,38 @@ class GraphWin(tk.Canvas):
         else:
             return None
 
-    def getKey(self):
-        """Wait for user to press a key and return it as a string."""
+    def getKey(self, timeout=None):
+        """Wait for user to press a key and return it as a string, or
+        None if timeout is given and that many seconds pass first."""
         self.lastKey = ""
-        while self.lastKey == "":
-            self.update()
-            if self.isClosed(): raise GraphicsError("getKey in closed window")
-            time.sleep(.1)  # give up thread
-
+        if not self.__waitForInput(lambda: self.lastKey != "", timeout, "getKey"):
+            return None
         key = self.lastKey
         self.lastKey = ""
         return key
 
+    def wait(self):
+        """Process events until stopWaiting is called (typically from a
+        mouse handler or an after() timer) and return the value passed
+        to it. Sleeps inside the Tk event loop, so waiting uses no CPU."""
+        self.__checkOpen()
+        self._waitDone = False
+        self._waitResult = None
+        while not self._waitDone:
+            self.wait_variable(self._waitVar)
+            if self.isClosed(): raise GraphicsError("wait in closed window")
+        result = self._waitResult
+        self._waitResult = None
+        return result
+
+    def stopWaiting(self, result=None):
+        """End the current wait, which returns result. Calls made after
+        the wait has already been ended are ignored."""
+        if self._waitDone: return
+        self._waitDone = True
+        self._waitResult = result
+        self._waitVar.set(1)
+
     def checkKey(self):
         """Return last key pressed or None if no key pressed since last call"""
         if self.isClosed():
@@ -400,26 +1083,231 @@ class GraphWin(tk.Canvas):
     def setMouseHandler(self, func):
         self._mouseCallback = func
 
+    def setClickListener(self, func):
+        """Call func(x, y, button) with the canvas position of every
+        click before it is handled, e.g. to log a session's input.
+        None removes the listener."""
+        self._clickListener = func
+
+    def injectClick(self, x, y, button=1):
+        """Handle a click at canvas position (x, y) as if the user had
+        made it, so getMouse, checkMouse and the mouse handler see it."""
+        self._onClick(_Event(x, y, button))
+
     def _onClick(self, e):
+        if self._clickListener:
+            self._clickListener(e.x, e.y, e.num)
         self.mouseX = e.x
         self.mouseY = e.y
         self.mouseNum = e.num
+        self._waitVar.set(1)  # wake up a pending getMouse
+        if self._mouseFutures:
+            x, y = self.toWorld(e.x, e.y)
+            if _resolveFutures(self._mouseFutures, Point(x, y)):
+                self.mouseX = None
+                self.mouseY = None
         if self._mouseCallback:
             self._mouseCallback(Point(e.x, e.y))
 
+    def mouse(self):
+        """Return an asyncio future for the Point of the next mouse
+        click, for `await win.mouse()` in a coroutine. The click is not
+        seen by checkMouse. Only resolves while the backend's events are
+        being handled from the asyncio loop; see graphics_asyncio."""
+        self.__checkOpen()
+        return _newFuture(self._mouseFutures)
+
+    def key(self):
+        """Return an asyncio future for the next key pressed, as a
+        string, like getKey."""
+        self.__checkOpen()
+        return _newFuture(self._keyFutures)
+
+    def timer(self, ms):
+        """Return an asyncio future that resolves to None after ms
+        milliseconds, timed by after() so that it follows the backend's
+        clock. Cancelling the future cancels the timer."""
+        self.__checkOpen()
+        future = _newFuture()
+        timerId = self.after(ms, _resolveFutures, [future], None)
+
+        def cancelTimer(future):
+            if future.cancelled() and not self.closed:
+                self.after_cancel(timerId)
+        future.add_done_callback(cancelTimer)
+        return future
+
+    def addTarget(self, target, p1, p2):
+        """Make target clickable in the rectangle with corners p1 and p2
+        (in world coordinates) so targetAt can find it. Adding a target
+        again moves it."""
+        self.hitIndex.add(target, p1.getX(), p1.getY(), p2.getX(), p2.getY())
+
+    def removeTarget(self, target):
+        """Stop target from being found by targetAt."""
+        self.hitIndex.remove(target)
+
+    def targetAt(self, point):
+        """Return the target added most recently whose rectangle contains
+        point, or None if there is none."""
+        return self.hitIndex.find(point.getX(), point.getY())
+
     def addItem(self, item):
-        self.items.append(item)
+        self.items[item] = None
 
     def delItem(self, item):
-        self.items.remove(item)
+        del self.items[item]
 
     def redraw(self):
-        for item in self.items[:]:
-            item.undraw()
-            item.draw(self)
+        # Recreate each canvas item in place; the registry itself is
+        # left alone so it can be iterated without a copy.
+        for item in self.items:
+            self.delete(item.id)
+            item.id = item._draw(self, item.config)
+            if item.hidden:
+                self.itemconfig(item.id, state="hidden")
         self.update()
 
 
+class Stage:
+    """A toplevel window that shows one of several GraphWins, its
+    scenes, at a time. A scene keeps its canvas and drawn objects while
+    another one is shown, so switching screens recreates nothing."""
+
+    def __init__(self, title="Graphics Window"):
+        master = _backend.toplevel()
+        master.protocol("WM_DELETE_WINDOW", self.close)
+        master.title(title)
+        master.resizable(0, 0)
+        self.master = master
+        self.scenes = []
+        self.current = None
+        self.closed = False
+
+    def __repr__(self):
+        return "<Closed Stage>" if self.closed else "Stage('{}')".format(self.master.title())
+
+    def scene(self, width=200, height=200, autoflush=True):
+        """Make a new scene, a GraphWin in this window that is not
+        shown until passed to show."""
+        if self.closed: raise GraphicsError("scene in closed stage")
+        win = GraphWin(self.master.title(), width, height, autoflush, stage=self)
+        self.scenes.append(win)
+        return win
+
+    def show(self, win, title=None):
+        """Show scene win in place of the one shown before, and send
+        key presses to it. The window takes the size of the scene."""
+        if self.closed: raise GraphicsError("show in closed stage")
+        if title: self.master.title(title)
+        if win is not self.current:
+            if self.current: self.current.canvas.pack_forget()
+            win.canvas.pack()
+            win.bind_all("<Key>", win._onKey)
+            self.current = win
+        self.master.lift()
+        if win.autoflush: _backend.update()
+
+    def _remove(self, win):
+        self.scenes.remove(win)
+        if win is self.current: self.current = None
+
+    def close(self):
+        """Close the window and every scene in it."""
+        if self.closed: return
+        self.closed = True
+        for win in list(self.scenes):
+            win.close()
+        self.master.destroy()
+        _backend.update()
+
+    def isClosed(self):
+        return self.closed
+
+
+class HitIndex:
+    """Finds which of many rectangular targets contains a point.
+
+    The rectangles are kept in one flat array of coordinates, and a
+    coarse grid maps each cell to the rectangles overlapping it, so a
+    lookup only compares the point against the few rectangles near it
+    however many targets there are. Where rectangles overlap, the one
+    added last wins, as it would be drawn on top."""
+
+    def __init__(self, cellSize=64):
+        self.cellSize = cellSize
+        self.coords = array("d")  # x1, y1, x2, y2 for each slot
+        self.stamps = array("L")  # when each slot was filled, for stacking
+        self.targets = []         # target in each slot, None when free
+        self.slots = {}           # target -> slot
+        self.free = []
+        self.cells = {}           # (column, row) -> list of slots
+        self.count = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _cellRange(self, slot):
+        size = self.cellSize
+        c = self.coords
+        i = slot * 4
+        return (range(int(c[i] // size), int(c[i + 2] // size) + 1),
+                range(int(c[i + 1] // size), int(c[i + 3] // size) + 1))
+
+    def add(self, target, x1, y1, x2, y2):
+        """Add target, clickable anywhere in the rectangle from (x1, y1)
+        to (x2, y2). A target already in the index is moved."""
+        if target in self.slots:
+            self.remove(target)
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        self.count = self.count + 1
+        if self.free:
+            slot = self.free.pop()
+            self.coords[slot * 4:slot * 4 + 4] = array("d", (x1, y1, x2, y2))
+            self.stamps[slot] = self.count
+            self.targets[slot] = target
+        else:
+            slot = len(self.targets)
+            self.coords.extend((x1, y1, x2, y2))
+            self.stamps.append(self.count)
+            self.targets.append(target)
+        self.slots[target] = slot
+        columns, rows = self._cellRange(slot)
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append(slot)
+
+    def remove(self, target):
+        """Remove target; does nothing if it is not in the index."""
+        slot = self.slots.pop(target, None)
+        if slot is None: return
+        columns, rows = self._cellRange(slot)
+        for column in columns:
+            for row in rows:
+                cell = self.cells[(column, row)]
+                cell.remove(slot)
+                if not cell: del self.cells[(column, row)]
+        self.targets[slot] = None
+        self.free.append(slot)
+
+    def find(self, x, y):
+        """Return the topmost target containing (x, y), or None."""
+        size = self.cellSize
+        cell = self.cells.get((int(x // size), int(y // size)))
+        if not cell: return None
+        c = self.coords
+        best = None
+        bestStamp = 0
+        for slot in cell:
+            i = slot * 4
+            if c[i] <= x <= c[i + 2] and c[i + 1] <= y <= c[i + 3] \
+                    and self.stamps[slot] > bestStamp:
+                best = slot
+                bestStamp = self.stamps[slot]
+        return None if best is None else self.targets[best]
+
+
 class Transform:
     """Internal class for 2-D coordinate transformations"""
 
@@ -473,6 +1361,7 @@ class GraphicsObject:
         #    drawn shape.
         self.canvas = None
         self.id = None
+        self.hidden = False
 
         # config is the dictionary of configuration options for the widget.
         config = {}
@@ -501,11 +1390,16 @@ class GraphicsObject:
 
         if self.canvas and not self.canvas.isClosed(): raise GraphicsError(OBJ_ALREADY_DRAWN)
         if graphwin.isClosed(): raise GraphicsError("Can't draw to closed window")
+        recorder = _recorder
+        if recorder: start = recorder.clock()
         self.canvas = graphwin
         self.id = self._draw(graphwin, self.config)
+        if self.hidden:
+            graphwin.itemconfig(self.id, state="hidden")
         graphwin.addItem(self)
         if graphwin.autoflush:
-            _root.update()
+            graphwin.update()
+        if recorder: recorder.record("draw", start, recorder.clock() - start)
         return self
 
     def undraw(self):
@@ -514,13 +1408,16 @@ class GraphicsObject:
         object is not currently drawn."""
 
         if not self.canvas: return
+        recorder = _recorder
+        if recorder: start = recorder.clock()
         if not self.canvas.isClosed():
             self.canvas.delete(self.id)
             self.canvas.delItem(self)
             if self.canvas.autoflush:
-                _root.update()
+                self.canvas.update()
         self.canvas = None
         self.id = None
+        if recorder: recorder.record("undraw", start, recorder.clock() - start)
 
     def move(self, dx, dy):
 
@@ -539,7 +1436,25 @@ class GraphicsObject:
                 y = dy
             self.canvas.move(self.id, x, y)
             if canvas.autoflush:
-                _root.update()
+                canvas.update()
+
+    def hide(self):
+        """Make the object invisible while leaving it on the canvas, so
+        it can be shown again without being recreated."""
+        self._setHidden(True)
+
+    def show(self):
+        """Make an object hidden with hide visible again."""
+        self._setHidden(False)
+
+    def _setHidden(self, hidden):
+        if hidden == self.hidden: return
+        self.hidden = hidden
+        canvas = self.canvas
+        if canvas and not canvas.isClosed():
+            canvas.itemconfig(self.id, state="hidden" if hidden else "normal")
+            if canvas.autoflush:
+                canvas.update()
 
     def _reconfig(self, option, setting):
         # Internal method for changing configuration of the object
@@ -547,12 +1462,12 @@ class GraphicsObject:
         #    dictionary for this object
         if option not in self.config:
             raise GraphicsError(UNSUPPORTED_METHOD)
-        options = self.config
-        options[option] = setting
+        self.config[option] = setting
         if self.canvas and not self.canvas.isClosed():
-            self.canvas.itemconfig(self.id, options)
+            # the other options are already on the item
+            self.canvas.itemconfig(self.id, {option: setting})
             if self.canvas.autoflush:
-                _root.update()
+                self.canvas.update()
 
     def _draw(self, canvas, options):
         """draws appropriate figure on canvas with options provided
@@ -676,6 +1591,55 @@ class Circle(Oval):
         return self.radius
 
 
+class Circles(GraphicsObject):
+    """Any number of circles of one radius, drawn, configured, moved and
+    hidden together as a single object. The canvas items share a tag
+    that serves as the object's id, so each of those operations is one
+    canvas call however many circles there are."""
+
+    tagCount = 0
+
+    def __init__(self, centers, radius):
+        # centers is a flat sequence x0, y0, x1, y1, ...
+        GraphicsObject.__init__(self, ["outline", "width", "fill"])
+        self.centers = array("d", centers)
+        self.radius = radius
+
+    def __repr__(self):
+        return "Circles({} circles, {})".format(len(self), self.radius)
+
+    def __len__(self):
+        return len(self.centers) // 2
+
+    def clone(self):
+        other = Circles(self.centers, self.radius)
+        other.config = self.config.copy()
+        return other
+
+    def getCenter(self, i):
+        return Point(self.centers[2 * i], self.centers[2 * i + 1])
+
+    def getRadius(self):
+        return self.radius
+
+    def _draw(self, canvas, options):
+        Circles.tagCount = Circles.tagCount + 1
+        tag = "circles{}".format(Circles.tagCount)
+        r = self.radius
+        centers = self.centers
+        for i in range(0, len(centers), 2):
+            x1, y1 = canvas.toScreen(centers[i] - r, centers[i + 1] - r)
+            x2, y2 = canvas.toScreen(centers[i] + r, centers[i + 1] + r)
+            canvas.create_oval(x1, y1, x2, y2, options, tags=tag)
+        return tag
+
+    def _move(self, dx, dy):
+        centers = self.centers
+        for i in range(0, len(centers), 2):
+            centers[i] = centers[i] + dx
+            centers[i + 1] = centers[i + 1] + dy
+
+
 class Line(_BBox):
     def __init__(self, p1, p2):
         _BBox.__init__(self, p1, p2, ["arrow", "fill", "width"])
@@ -727,13 +1691,13 @@ class Polygon(GraphicsObject):
             p.move(dx, dy)
 
     def _draw(self, canvas, options):
-        args = [canvas]
+        args = []
         for p in self.points:
             x, y = canvas.toScreen(p.x, p.y)
             args.append(x)
             args.append(y)
         args.append(options)
-        return GraphWin.create_polygon(*args)
+        return canvas.create_polygon(*args)
 
 
 class Text(GraphicsObject):
@@ -800,7 +1764,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         # print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = _backend.stringVar()
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -813,8 +1777,8 @@ class Entry(GraphicsObject):
     def _draw(self, canvas, options):
         p = self.anchor
         x, y = canvas.toScreen(p.x, p.y)
-        frm = tk.Frame(canvas.master)
-        self.entry = tk.Entry(frm,
+        frm = _backend.frame(canvas.master)
+        self.entry = _backend.entry(frm,
                               width=self.width,
                               textvariable=self.text,
                               bg=self.fill,
@@ -837,7 +1801,7 @@ class Entry(GraphicsObject):
     def clone(self):
         other = Entry(self.anchor, self.width)
         other.config = self.config.copy()
-        other.text = tk.StringVar()
+        other.text = _backend.stringVar()
         other.text.set(self.text.get())
         other.fill = self.fill
         return other
@@ -884,17 +1848,45 @@ class Entry(GraphicsObject):
 class Image(GraphicsObject):
     idCount = 0
     imageCache = {}  # tk photoimages go here to avoid GC while drawn
+    fileCache = OrderedDict()  # decoded photoimages by file, oldest use first
+    fileCacheSize = 32
 
     def __init__(self, p, *pixmap):
         GraphicsObject.__init__(self, [])
         self.anchor = p.clone()
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
-        if len(pixmap) == 1:  # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+        if isinstance(pixmap[0], str):  # file name, and maybe a region of it, provided
+            self.img = Image.loadFile(*pixmap)
+            self.shared = True
         else:  # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = _backend.photoImage(width=width, height=height)
+            self.shared = False
+
+    @staticmethod
+    def loadFile(filename, region=None):
+        """Return the decoded photoimage for filename, or for the region
+        (x, y, width, height) of it. Each file is read and decoded once;
+        later Images of the same file or region share the result. The
+        least recently used entries are dropped from the cache once it
+        holds more than Image.fileCacheSize of them."""
+        if region is not None:
+            region = tuple(region)
+        key = (_backend, os.path.abspath(filename), region)
+        cache = Image.fileCache
+        img = cache.get(key)
+        if img is None:
+            if region is None:
+                img = _backend.photoImage(file=filename)
+            else:
+                img = _backend.cropPhoto(Image.loadFile(filename), *region)
+            cache[key] = img
+            while len(cache) > Image.fileCacheSize:
+                cache.popitem(last=False)
+        else:
+            cache[key] = cache.pop(key)
+        return img
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -921,6 +1913,7 @@ class Image(GraphicsObject):
     def clone(self):
         other = Image(Point(0, 0), 0, 0)
         other.img = self.img.copy()
+        other.shared = False
         other.anchor = self.anchor.clone()
         other.config = self.config.copy()
         return other
@@ -951,6 +1944,9 @@ class Image(GraphicsObject):
         """Sets pixel (x,y) to the given color
 
         """
+        if self.shared:  # don't paint on the cached copy of the file
+            self.img = self.img.copy()
+            self.shared = False
         self.img.put("{" + color + "}", (x, y))
 
     def save(self, filename):
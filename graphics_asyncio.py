@@ -0,0 +1,66 @@
+"""
+Runs graphics.py windows from an asyncio event loop, so coroutines can
+`await win.mouse()`, `await win.key()` and `await win.timer(ms)` and run
+beside other asyncio tasks in one thread.
+
+    async def main():
+        win = GraphWin()
+        click = await win.mouse()
+        ...
+
+    graphics_asyncio.run(main())
+
+Under the Tk backend, pump() handles pending Tk events every few
+milliseconds. Under the headless backend it runs the backend's after()
+timers in order on its virtual clock, so only futures from GraphWin (not
+asyncio.sleep) mark the passing of game time there.
+"""
+import asyncio
+
+import graphics
+
+# seconds between checks for Tk events; also the most a click can wait
+TK_INTERVAL = 0.005
+# real seconds given to other tasks after each headless timer, so they
+# settle before virtual time moves on
+HEADLESS_SETTLE = 0.0005
+
+
+async def pump():
+    """
+    Handles the current backend's events for as long as it runs.
+    Start it as a task beside the coroutines that await GraphWin
+    futures, and cancel it when they are done.
+    """
+    backend = graphics.getBackend()
+    if backend.name == 'headless':
+        while True:
+            if backend.step():
+                await asyncio.sleep(HEADLESS_SETTLE)
+            else:
+                await asyncio.sleep(TK_INTERVAL)
+    else:
+        while True:
+            backend.update()
+            await asyncio.sleep(TK_INTERVAL)
+
+
+async def pumping(main):
+    """
+    :param main: coroutine to run
+    :return: what main returns, after running it with pump() going
+    """
+    events = asyncio.ensure_future(pump())
+    try:
+        return await main
+    finally:
+        events.cancel()
+
+
+def run(main):
+    """
+    Runs coroutine main in a new asyncio loop while the backend's
+    events are handled, like asyncio.run.
+    :return: what main returns
+    """
+    return asyncio.run(pumping(main))
@@ -0,0 +1,62 @@
+import random
+import unittest
+
+import graphics
+from graphics import HitIndex
+
+
+class HitIndexTest(unittest.TestCase):
+    def test_matches_a_scan_of_every_rectangle(self):
+        rng = random.Random(0)
+        index = HitIndex(cellSize=50)
+        rectangles = {}
+        for i in range(300):
+            x, y = rng.uniform(0, 800), rng.uniform(0, 800)
+            rectangles[i] = (x, y, x + rng.uniform(1, 120), y + rng.uniform(1, 120))
+            index.add(i, *rectangles[i])
+        for i in range(0, 300, 3):
+            index.remove(i)
+            del rectangles[i]
+        self.assertEqual(len(index), len(rectangles))
+        for j in range(2000):
+            x, y = rng.uniform(0, 900), rng.uniform(0, 900)
+            hits = [i for i, (x1, y1, x2, y2) in rectangles.items() if x1 <= x <= x2 and y1 <= y <= y2]
+            self.assertEqual(index.find(x, y), max(hits) if hits else None)
+
+    def test_added_last_is_on_top_and_moves(self):
+        index = HitIndex()
+        index.add('a', 0, 0, 100, 100)
+        index.add('b', 50, 50, 150, 150)
+        self.assertEqual(index.find(75, 75), 'b')
+        index.add('a', 100, 100, 0, 0)  # moving a puts it on top
+        self.assertEqual(index.find(75, 75), 'a')
+        index.remove('a')
+        index.remove('a')
+        self.assertEqual(index.find(25, 25), None)
+        self.assertEqual(index.find(75, 75), 'b')
+
+
+class BackendTest(unittest.TestCase):
+    def tearDown(self):
+        graphics.setBackend('headless')
+
+    def test_pacing_starts_on_the_new_backend_clock(self):
+        graphics.setBackend('headless')
+        graphics.update(60)
+        self.assertAlmostEqual(graphics.clock(), 1 / 60)
+
+    def test_headless_timers_run_in_order_on_a_virtual_clock(self):
+        graphics.setBackend('headless')
+        win = graphics.GraphWin('test', 100, 100)
+        fired = []
+        win.after(30, lambda: fired.append(('b', graphics.clock())))
+        win.after(10, lambda: fired.append(('a', graphics.clock())))
+        win.after(50, win.stopWaiting)
+        win.wait()
+        win.close()
+        self.assertEqual([name for name, when in fired], ['a', 'b'])
+        self.assertAlmostEqual(fired[1][1] - fired[0][1], 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
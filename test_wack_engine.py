@@ -0,0 +1,190 @@
+import random
+import unittest
+
+from wack_engine import (LEVELS, PASS_HITS, POPS_PER_LEVEL, Board, LinearCurve, UniformSampler,
+                         WeightedSampler, WackEngine)
+
+
+def play_level(game, hits):
+    """
+    Plays the current level by steps, hitting the first hits heads
+    and missing the rest.
+    """
+    for i in range(POPS_PER_LEVEL):
+        game.pop()
+        if i < hits:
+            game.hit()
+        else:
+            game.miss()
+
+
+class EngineRulesTest(unittest.TestCase):
+    def setUp(self):
+        self.game = WackEngine(UniformSampler(random.Random(0)))
+        self.events = []
+        self.game.listeners.append(lambda *event: self.events.append(event))
+
+    def test_passing_a_level(self):
+        play_level(self.game, PASS_HITS)
+        self.assertTrue(self.game.level_done())
+        self.assertFalse(self.game.over)
+        self.assertIn(('level_end', 1, PASS_HITS), self.events)
+        self.game.next_level()
+        self.assertEqual(self.game.level, 2)
+        self.assertEqual(self.game.hits, 0)
+        self.assertEqual(self.game.score, PASS_HITS)
+
+    def test_failing_a_level(self):
+        play_level(self.game, PASS_HITS - 1)
+        self.assertTrue(self.game.over)
+        self.assertEqual(self.events[-1], ('game_over', PASS_HITS - 1, 1))
+        self.assertEqual(self.game.result(), (PASS_HITS - 1, 1))
+
+    def test_last_level_ends_the_game(self):
+        for level in range(LEVELS):
+            play_level(self.game, POPS_PER_LEVEL)
+            self.game.next_level()
+        self.assertTrue(self.game.over)
+        self.assertEqual(self.game.result(), (LEVELS * POPS_PER_LEVEL, LEVELS))
+
+    def test_pops_and_pass_hits_settings(self):
+        game = WackEngine(UniformSampler(random.Random(0)), pops=3, pass_hits=1)
+        for i in range(3):
+            game.pop()
+            game.miss()
+        self.assertTrue(game.level_done())
+        self.assertTrue(game.over)
+        with self.assertRaises(ValueError):
+            WackEngine(pops=3, pass_hits=4)
+
+    def test_too_many_heads(self):
+        with self.assertRaises(ValueError):
+            WackEngine(heads=7)
+
+
+class EngineTickTest(unittest.TestCase):
+    def test_heads_are_spaced_and_time_out(self):
+        heads = 3
+        game = WackEngine(UniformSampler(random.Random(1)), heads=heads)
+        head_time, spacing = game.schedule[1]
+        self.assertAlmostEqual(spacing, head_time / heads)
+        game.tick(0.0)
+        self.assertEqual(len(game.active), 1)
+        self.assertEqual(game.next_time(), spacing)
+        game.tick(spacing)
+        game.tick(2 * spacing)
+        self.assertEqual(len(game.active), heads)
+        self.assertFalse(game.can_pop())
+        first = min(game.active, key=game.active.get)
+        self.assertEqual(game.next_time(), head_time)
+        game.tick(head_time)
+        self.assertNotIn(first, game.active)
+        self.assertEqual(game.pops, 1)
+        self.assertEqual(game.hits, 0)
+
+    def test_next_time_skips_heads_already_hit(self):
+        game = WackEngine(UniformSampler(random.Random(2)), heads=2)
+        head_time, spacing = game.schedule[1]
+        game.tick(0.0)
+        game.tick(spacing)
+        game.hit(min(game.active, key=game.active.get))
+        self.assertEqual(game.next_time(), 2 * spacing)  # room for another head
+        game.tick(2 * spacing)
+        # the hit head's deadline, head_time, is skipped
+        self.assertEqual(game.next_time(), spacing + head_time)
+
+    def test_never_more_heads_than_allowed(self):
+        heads = 4
+        game = WackEngine(UniformSampler(random.Random(3)), heads=heads)
+        now = 0.0
+        while not game.over:
+            game.tick(now)
+            self.assertLessEqual(len(game.active), heads)
+            self.assertEqual(len(set(game.active)), len(game.active))
+            if game.level_done():
+                game.next_level()
+            else:
+                now = game.next_time()
+
+    def test_full_weighted_board_does_not_hang(self):
+        weights = [0, 1, 1, 0, 1, 1, 1, 1, 0, 0, 0, 1]
+        game = WackEngine(WeightedSampler(weights, random.Random(1)), heads=4)
+        now = 0.0
+        while not game.over and now < 1000:
+            game.tick(now)
+            if game.level_done():
+                game.next_level()
+            now += 0.05
+        self.assertTrue(game.over)
+
+
+class SamplerTest(unittest.TestCase):
+    def check_sampler(self, sampler, board, weights=None):
+        rng = random.Random(5)
+        for i in range(2000):
+            previous = rng.choice([None] + list(range(len(board))))
+            taken = set(rng.sample(range(len(board)), rng.randrange(len(board))))
+            hole = sampler.next_hole(previous, taken)
+            allowed = set(board.successors()[previous]) - taken
+            if weights:
+                allowed = set(hole for hole in allowed if weights[hole])
+            if not allowed:
+                self.assertIsNone(hole)
+                continue
+            self.assertIn(hole, allowed)
+
+    def test_uniform_sampler(self):
+        board = Board(5, 4)
+        self.check_sampler(UniformSampler(random.Random(0), board), board)
+
+    def test_weighted_sampler(self):
+        board = Board()
+        weights = [0, 1, 2, 0, 1, 1, 3, 1, 0, 2, 0, 1]
+        self.check_sampler(WeightedSampler(weights, random.Random(0), board), board, weights)
+
+    def test_uniform_sampler_is_even(self):
+        sampler = UniformSampler(random.Random(0))
+        counts = {}
+        for i in range(6000):
+            hole = sampler.next_hole(5, {0, 2, 10})
+            counts[hole] = counts.get(hole, 0) + 1
+        self.assertEqual(sorted(counts), [3, 8, 11])
+        for n in counts.values():
+            self.assertAlmostEqual(n / 6000, 1 / 3, delta=0.03)
+
+
+class BoardTest(unittest.TestCase):
+    def test_default_board(self):
+        board = Board()
+        self.assertEqual(len(board), 12)
+        self.assertEqual(board.center(0), (175, 300))
+        self.assertEqual(board.center(11), (625, 600))
+
+    def test_hole_at(self):
+        board = Board(5, 4)
+        for hole in range(len(board)):
+            x, y = board.center(hole)
+            self.assertEqual(board.hole_at(x, y), hole)
+        self.assertIsNone(board.hole_at(0, 0))
+
+    def test_click_hits_only_near_the_head(self):
+        game = WackEngine(UniformSampler(random.Random(0)))
+        x, y = game.pop()
+        self.assertFalse(game.click(x + 60, y))
+        self.assertTrue(game.click(x + 30, y - 30))
+        self.assertEqual(game.score, 1)
+
+
+class CurveTest(unittest.TestCase):
+    def test_linear_curve(self):
+        curve = LinearCurve()
+        self.assertAlmostEqual(curve.head_time(1), 2.0)
+        self.assertAlmostEqual(curve.head_time(LEVELS), 0.2)
+
+    def test_head_time_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            WackEngine(curve=LinearCurve(1.0, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import random
+import unittest
+
+from graphics import setBackend
+from wack_engine import LinearCurve, UniformSampler, WackEngine
+from wack_interface import SimulationInterface
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+POLITICIAN = ('Donald Trump', 'indianred', 'him', os.path.join(HERE, 'trump.gif'))
+
+
+class SimulationTest(unittest.TestCase):
+    def setUp(self):
+        setBackend('headless')
+
+    def play(self, seed, turbo, curve=None):
+        engine = WackEngine(UniformSampler(random.Random(seed)), curve=curve)
+        game = SimulationInterface(POLITICIAN, turbo=turbo, engine=engine)
+        return game.play(), len(game.timeline)
+
+    def test_turbo_and_animated_agree(self):
+        for seed in range(3):
+            self.assertEqual(self.play(seed, True), self.play(seed, False))
+
+    def test_turbo_and_animated_agree_when_the_bot_misses(self):
+        curve = LinearCurve(0.5, 0.1)
+        for seed in range(3):
+            turbo = self.play(seed, True, curve)
+            self.assertLess(turbo[0][0], turbo[0][1] * 8)  # some heads were missed
+            self.assertEqual(turbo, self.play(seed, False, curve))
+
+
+if __name__ == '__main__':
+    unittest.main()
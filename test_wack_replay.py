@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from graphics import setBackend
+from wack_engine import DEFAULT_BOARD
+from wack_interface import GameInterface
+from wack_replay import read_log, record_game, replay_game
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+POLITICIAN = ('Donald Trump', 'indianred', 'him', os.path.join(HERE, 'trump.gif'))
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        setBackend('headless')
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, 'session.wack')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_fast_replay_gives_the_recorded_result(self):
+        game = GameInterface(POLITICIAN)
+        # start, then keep clicking every hole, and the next level button
+        clicks = [(10, 400, 425)]
+        ms = 10
+        while ms < 120000:
+            for hole in range(len(DEFAULT_BOARD)):
+                ms += 30
+                x, y = DEFAULT_BOARD.center(hole)
+                clicks.append((ms, int(x), int(y)))
+            ms += 30
+            clicks.append((ms, 400, 425))
+        for ms, x, y in clicks:
+            game.win.after(ms, game.win.injectClick, x, y)
+        result = record_game(POLITICIAN, self.log, seed=7, heads=2, game=game)
+
+        politician, seed, heads, logged = read_log(self.log)
+        self.assertEqual((politician, seed, heads), (POLITICIAN, 7, 2))
+        self.assertEqual([click[1:3] for click in logged], [click[1:] for click in clicks[:len(logged)]])
+        self.assertGreater(result[0], 0)
+        self.assertEqual(replay_game(self.log, fast=True), result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from wack_scores import ScoreStore
+
+
+class ScoreStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # characters that mean something in a URI
+        self.scores = ScoreStore(os.path.join(self.directory, 'scores ?#%.db'))
+
+    def tearDown(self):
+        self.scores.close()
+        shutil.rmtree(self.directory)
+
+    def test_top_and_percentile(self):
+        for score, level in [(10, 3), (30, 5), (20, 4), (50, 10)]:
+            self.scores.add('Donald Trump', 'play', score, level)
+        self.scores.add('Donald Trump', 'sim', 80, 10)
+        self.assertTrue(self.scores.flush(5))
+        self.assertEqual([row[:2] for row in self.scores.top('Donald Trump', 'play', 2)], [(50, 10), (30, 5)])
+        self.assertEqual([row[:2] for row in self.scores.top('Donald Trump', 'play', level=4)], [(20, 4)])
+        self.assertEqual(self.scores.percentile('Donald Trump', 'play', 25), 50.0)
+        self.assertIsNone(self.scores.percentile('Hillary Clinton', 'play', 25))
+
+    def test_rank_leaves_out_the_game_being_ranked(self):
+        self.scores.add('Donald Trump', 'play', 20, 5)
+        self.assertTrue(self.scores.flush(5))
+        time.sleep(0.01)  # so the two games are saved at different times
+        self.scores.add('Donald Trump', 'play', 50, 10)
+        before = self.scores.rank('Donald Trump', 'play', 50)
+        self.assertTrue(self.scores.flush(5))
+        self.assertEqual(before, (100.0, 50))
+        self.assertEqual(self.scores.rank('Donald Trump', 'play', 50), (100.0, 50))
+
+    def test_rank_of_the_first_game(self):
+        self.scores.add('Donald Trump', 'play', 20, 5)
+        self.assertEqual(self.scores.rank('Donald Trump', 'play', 20), (None, 20))
+        self.assertTrue(self.scores.flush(5))
+        self.assertEqual(self.scores.rank('Donald Trump', 'play', 20), (None, 20))
+
+    def test_compact_keeps_the_best_old_games(self):
+        for score in range(5):
+            self.scores.add('Donald Trump', 'play', score, 1)
+        self.scores.compact(max_age=-1, keep=2)
+        self.assertTrue(self.scores.flush(5))
+        self.assertEqual([row[0] for row in self.scores.top('Donald Trump', 'play')], [4, 3])
+
+    def test_flush_after_close_returns(self):
+        self.scores.close()
+        self.assertFalse(self.scores.flush())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import os
+from graphics import Image
+
+# Sprite atlas of the politician heads, written by build_atlas.py: one
+# image holding every head, pre-scaled, and an index of where each is
+HERE = os.path.dirname(os.path.abspath(__file__))
+ATLAS_INDEX = os.path.join(HERE, 'heads.json')
+
+_atlas = None
+
+
+def load_atlas():
+    """
+    Reads the atlas index, once.
+    :return: atlas image filename,
+             dictionary from head filename to (x, y, width, height)
+             of that head in the atlas image; no heads if there is
+             no atlas
+    """
+    global _atlas
+    if _atlas is None:
+        try:
+            with open(ATLAS_INDEX) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            index = {'image': None, 'sprites': {}}
+        image = index['image'] and os.path.join(HERE, index['image'])
+        _atlas = image, dict((name, tuple(region)) for name, region in index['sprites'].items())
+    return _atlas
+
+
+def head_image(point, politician_pic):
+    """
+    Makes an image of a politician head, cut from the atlas if the head
+    is in it and read from its own file otherwise.
+    :param point: Point(x, y) where head is drawn
+    :param politician_pic: filename of image of head
+    :return: Image
+    """
+    image, sprites = load_atlas()
+    region = sprites.get(os.path.basename(politician_pic))
+    if region is None:
+        return Image(point, politician_pic)
+    return Image(point, image, region)
+
+
+def preload():
+    """
+    Decodes the atlas and cuts out every head ahead of time, so picking
+    a politician and starting a game read no files.
+    """
+    image, sprites = load_atlas()
+    for region in sprites.values():
+        Image.loadFile(image, region)
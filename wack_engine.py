@@ -0,0 +1,470 @@
+
+import heapq
+import random
+from array import array
+from bisect import bisect_right
+
+# Rules of the game
+LEVELS = 10
+POPS_PER_LEVEL = 8
+PASS_HITS = 4  # hits needed in a level to go on to the next one
+HEAD_REACH = 40  # a click this close to the head's center (in x and y) hits it
+
+
+def successor_table(holes):
+    """
+    Works out where a head may pop up after each hole: anywhere not in
+    the same row or column. The first head of a game, which has no hole
+    before it, may pop up anywhere.
+    :param holes: list of (x, y) hole centers
+    :return: dictionary from hole number (or None for the first head)
+             to a tuple of the hole numbers that may come next
+    """
+    table = {None: tuple(range(len(holes)))}
+    for i, (x, y) in enumerate(holes):
+        table[i] = tuple(j for j, (x2, y2) in enumerate(holes) if x2 != x and y2 != y)
+    return table
+
+
+class Board:
+    """
+    A grid of holes, evenly spread over a rectangle of the game window.
+    Holes are numbered row by row from the top left, and their centers
+    are kept in one flat array: x0, y0, x1, y1, ...
+    The default is the original 4 x 3 board, with holes 150 apart
+    centered at x = 175 ... 625 and y = 300 ... 600.
+    """
+    def __init__(self, columns=4, rows=3, left=100, top=225, width=600, height=450):
+        """
+        :param columns: number of holes across
+        :param rows: number of holes down
+        :param left: left edge of the area the holes are spread over
+        :param top: top edge of that area
+        :param width: width of that area
+        :param height: height of that area
+        """
+        self.columns = columns
+        self.rows = rows
+        self.left = left
+        self.top = top
+        self.cell_width = cell_width = width / columns
+        self.cell_height = cell_height = height / rows
+        self.radius = min(cell_width, cell_height) / 6
+        self.centers = array('d')
+        for row in range(rows):
+            for column in range(columns):
+                self.centers.append(left + (column + 0.5) * cell_width)
+                self.centers.append(top + (row + 0.5) * cell_height)
+        self.table = None
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def center(self, hole):
+        """
+        :return: (x, y) center of a hole
+        """
+        return self.centers[2 * hole], self.centers[2 * hole + 1]
+
+    def hole_at(self, x, y):
+        """
+        :return: number of the hole whose grid cell contains (x, y),
+                 or None if (x, y) is off the board
+        """
+        column = int((x - self.left) // self.cell_width)
+        row = int((y - self.top) // self.cell_height)
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return row * self.columns + column
+        return None
+
+    def successors(self):
+        """
+        The successor_table() of the board, worked out the first time
+        it is asked for. It has about (columns x rows) squared entries,
+        so only use it on small boards.
+        """
+        if self.table is None:
+            self.table = successor_table([self.center(hole) for hole in range(len(self))])
+        return self.table
+
+
+DEFAULT_BOARD = Board()
+
+
+class UniformSampler:
+    """
+    Picks the next hole evenly from those allowed after the last one.
+    Any other column and any other row make an allowed hole, so it
+    picks one of each directly instead of drawing holes until one fits.
+
+    A sampler is anything with a next_hole(previous, taken) method that
+    takes the last hole number (None at the start of a game) and the
+    holes that already have a head up, and returns the next free hole,
+    or None if every allowed hole is taken; pass one to WackEngine to
+    change where heads pop up.
+    """
+    def __init__(self, rng=random, board=DEFAULT_BOARD):
+        """
+        :param rng: random number generator, e.g. random.Random(seed)
+                for a repeatable game; the random module if not given
+        :param board: board to pick holes on
+        """
+        if board.columns < 2 or board.rows < 2:
+            raise ValueError('a board needs at least 2 columns and 2 rows')
+        self.rng = rng
+        self.columns = board.columns
+        self.rows = board.rows
+
+    def next_hole(self, previous, taken=()):
+        columns = self.columns
+        if previous is None:
+            skip = sorted(taken)
+            return self.pick(columns * self.rows, skip)
+        row, column = divmod(previous, columns)
+        # number the allowed holes 0, 1, ... as the pick below does
+        skip = sorted((hole_row - (hole_row > row)) * (columns - 1) + hole_column - (hole_column > column)
+                      for hole_row, hole_column in (divmod(hole, columns) for hole in taken)
+                      if hole_row != row and hole_column != column)
+        pick = self.pick((columns - 1) * (self.rows - 1), skip)
+        if pick is None:
+            return None
+        new_row, new_column = divmod(pick, columns - 1)
+        # skip over the previous row and column
+        if new_column >= column:
+            new_column += 1
+        if new_row >= row:
+            new_row += 1
+        return new_row * columns + new_column
+
+    def pick(self, count, skip):
+        """
+        :param count: number of choices
+        :param skip: sorted choices that are taken
+        :return: one of the other choices, evenly, or None if there
+                 are none left
+        """
+        free = count - len(skip)
+        if free <= 0:
+            return None
+        pick = int(self.rng.random() * free)
+        for taken in skip:
+            if taken > pick:
+                break
+            pick += 1
+        return pick
+
+
+class WeightedSampler:
+    """
+    Picks the next hole from those allowed after the last one, with
+    some holes more likely than others.
+    """
+    def __init__(self, weights, rng=random, board=DEFAULT_BOARD):
+        """
+        :param weights: relative chance of each hole, by hole number
+        :param rng: random number generator
+        :param board: board to pick holes on
+        """
+        self.rng = rng
+        self.weights = weights
+        self.choices = {}
+        for previous, holes in board.successors().items():
+            total = 0
+            cum_weights = []
+            for hole in holes:
+                total += weights[hole]
+                cum_weights.append(total)
+            self.choices[previous] = (holes, cum_weights, {hole: i for i, hole in enumerate(holes)})
+
+    def next_hole(self, previous, taken=()):
+        holes, cum_weights, index = self.choices[previous]
+        weights = self.weights
+        # (where its share of the total starts, its share) for each taken hole
+        skip = sorted((cum_weights[index[hole]] - weights[hole], weights[hole])
+                      for hole in taken if hole in index)
+        free = cum_weights[-1] - sum(weight for start, weight in skip) if holes else 0
+        if free <= 0:
+            return None
+        point = self.rng.random() * free
+        for start, weight in skip:
+            if start > point:
+                break
+            point += weight
+        return holes[min(bisect_right(cum_weights, point), len(holes) - 1)]
+
+
+class LinearCurve:
+    """
+    Head times that shorten by the same amount every level. The
+    default is the original game's, from 2 seconds at level 1 down
+    to 0.2 seconds at level 10.
+
+    A difficulty curve is anything with a head_time(level) method that
+    returns how long in seconds a head stays up at that level; pass one
+    to WackEngine to change how fast the game gets harder.
+    """
+    def __init__(self, first=2.0, last=0.2, levels=LEVELS):
+        """
+        :param first: head time at level 1, in seconds
+        :param last: head time at the last level, in seconds
+        :param levels: number of levels the curve runs over
+        """
+        self.first = first
+        self.last = last
+        self.levels = levels
+
+    def head_time(self, level):
+        if self.levels == 1:
+            return self.first
+        return (self.first * (self.levels - level) + self.last * (level - 1)) / (self.levels - 1)
+
+
+class WackEngine:
+    """
+    The rules of Wack-A-Politician with no drawing or waiting: which
+    hole a head pops out of, how long it stays up, scoring, and when a
+    level or the game ends. Interfaces drive it one step at a time and
+    draw whatever state it is in.
+
+    Steps: pop() puts a head up, then hit() or miss() takes it down.
+    After self.pops_per_level heads (POPS_PER_LEVEL unless given) the
+    level is done; next_level() moves on if the game is not over.
+
+    Front ends that work from a clock instead call tick(now) whenever
+    next_time() comes around, and click(x, y) for clicks. tick() times
+    out heads and pops new ones itself, keeping up to self.heads heads
+    up at once, each with its own deadline. While other heads are up,
+    new ones are spaced at least head_time() / heads apart so their
+    lifetimes stay staggered. Both times come from self.schedule, worked
+    out for every level from the difficulty curve when the engine is
+    made, so nothing is computed while heads are up.
+
+    Functions in self.listeners are called for every event with the
+    event name followed by its values:
+        'pop', level, x, y, hole
+        'hit', level, score, hole
+        'miss', level, score, hole
+        'level_end', level, hits
+        'game_over', score, level
+    """
+    def __init__(self, sampler=None, board=DEFAULT_BOARD, heads=1, curve=None,
+                 pops=POPS_PER_LEVEL, pass_hits=PASS_HITS):
+        """
+        :param sampler: picks the hole each head pops out of, a
+                UniformSampler on the random module unless given
+        :param board: board the heads pop up on
+        :param heads: most heads that can be up at once, no more than
+                (columns - 1) x (rows - 1) for the board: 6 on the
+                default board
+        :param curve: difficulty curve giving how long heads stay up
+                at each level, the original LinearCurve unless given
+        :param pops: heads that pop up in each level; raise it with
+                heads, since no more heads than this are ever up at once
+        :param pass_hits: hits needed in a level to go on to the next
+        """
+        if heads > (board.columns - 1) * (board.rows - 1):
+            raise ValueError('too many heads for the board')
+        if not 0 <= pass_hits <= pops:
+            raise ValueError('pass_hits must be between 0 and pops')
+        curve = curve or LinearCurve()
+        self.schedule = [None]  # level -> (head time, time between pops)
+        for level in range(1, LEVELS + 1):
+            head_time = curve.head_time(level)
+            if head_time <= 0:
+                raise ValueError('head time at level {} is not positive'.format(level))
+            self.schedule.append((head_time, head_time / heads))
+        self.board = board
+        self.sampler = sampler or UniformSampler(board=board)
+        self.heads = heads
+        self.pops_per_level = pops
+        self.pass_hits = pass_hits
+        self.listeners = []
+        self.level = 1
+        self.score = 0
+        self.hits = 0
+        self.pops = 0  # heads of this level that have come down
+        self.popped = 0  # heads of this level that have come up
+        self.hole = None
+        self.x = 0
+        self.y = 0
+        self.active = {}  # hole -> deadline of the head up there
+        self.deadlines = []  # heap of (deadline, hole), may hold stale entries
+        self.next_spawn = 0
+        self.over = False
+
+    def emit(self, *event):
+        for listener in self.listeners:
+            listener(*event)
+
+    def head_time(self):
+        """
+        :return: how long in seconds a head stays up at the current level
+        """
+        return self.schedule[self.level][0]
+
+    def new_spot(self):
+        """
+        Finds the next spot for the head, making sure it is not
+        in the same row or column, let alone the same space, as
+        the head before, and that no other head is up there.
+        Reassigns self.hole, self.x and self.y if there is such a spot.
+        :return: True if a spot was found, False if every allowed
+                 spot has a head up already
+        """
+        hole = self.sampler.next_hole(self.hole, self.active)
+        if hole is None:
+            if not self.active:
+                raise ValueError('no hole a head may pop up in after hole {}'.format(self.hole))
+            return False
+        self.hole = hole
+        self.x, self.y = self.board.center(hole)
+        return True
+
+    def pop(self, now=None):
+        """
+        Puts a head up in a new spot. If every spot it may go to has a
+        head up already, no head pops and tick() tries again a head
+        spacing later.
+        :param now: current time, if the head should time out by tick()
+        :return: (x, y) center of the head, or None if no head popped
+        """
+        if not self.new_spot():
+            if now is not None:
+                self.next_spawn = now + self.schedule[self.level][1]
+            return None
+        self.popped += 1
+        if now is None:
+            self.active[self.hole] = None
+        else:
+            head_time, spacing = self.schedule[self.level]
+            deadline = now + head_time
+            self.active[self.hole] = deadline
+            heapq.heappush(self.deadlines, (deadline, self.hole))
+            self.next_spawn = now + spacing
+        if self.listeners:
+            self.emit('pop', self.level, self.x, self.y, self.hole)
+        return self.x, self.y
+
+    def hit(self, hole=None):
+        """
+        A head got wacked.
+        :param hole: where the head is, the last one popped if not given
+        """
+        if hole is None:
+            hole = self.hole
+        del self.active[hole]
+        self.hits += 1
+        self.score += 1
+        if self.listeners:
+            self.emit('hit', self.level, self.score, hole)
+        self.end_pop()
+
+    def miss(self, hole=None):
+        """
+        A head ran out of time.
+        :param hole: where the head is, the last one popped if not given
+        """
+        if hole is None:
+            hole = self.hole
+        del self.active[hole]
+        if self.listeners:
+            self.emit('miss', self.level, self.score, hole)
+        self.end_pop()
+
+    def end_pop(self):
+        self.pops += 1
+        if self.pops == self.pops_per_level:
+            if self.listeners:
+                self.emit('level_end', self.level, self.hits)
+            if self.hits < self.pass_hits:
+                self.end_game()
+
+    def can_pop(self):
+        """
+        :return: True if the level has heads left to pop and there is
+                 room for another one to be up
+        """
+        return not self.over and self.popped < self.pops_per_level and len(self.active) < self.heads
+
+    def tick(self, now):
+        """
+        Times out the heads whose time is up, then pops as many new
+        heads as the rules allow.
+        :param now: current time, on a clock that only goes forward
+        """
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] <= now:
+            deadline, hole = heapq.heappop(deadlines)
+            if self.active.get(hole) == deadline:
+                self.miss(hole)
+        while self.can_pop() and (not self.active or now >= self.next_spawn):
+            if self.pop(now) is None:
+                break
+
+    def next_time(self):
+        """
+        :return: when tick() next has something to do, or None if
+                 nothing will happen until the level changes
+        """
+        deadlines = self.deadlines
+        while deadlines and self.active.get(deadlines[0][1]) != deadlines[0][0]:
+            heapq.heappop(deadlines)  # head was hit before its deadline
+        times = []
+        if deadlines:
+            times.append(deadlines[0][0])
+        if self.can_pop():
+            times.append(self.next_spawn)
+        return min(times) if times else None
+
+    def click(self, x, y):
+        """
+        Hits the head at (x, y) if there is one. Only the head in the
+        board cell that was clicked is checked.
+        :return: True if a head was hit
+        """
+        hole = self.board.hole_at(x, y)
+        if hole in self.active:
+            hole_x, hole_y = self.board.center(hole)
+            if abs(x - hole_x) <= HEAD_REACH and abs(y - hole_y) <= HEAD_REACH:
+                self.hit(hole)
+                return True
+        return False
+
+    def level_done(self):
+        """
+        :return: True once every head of the current level has popped
+                 and come down again
+        """
+        return self.pops == self.pops_per_level
+
+    def next_level(self):
+        """
+        Goes on to the next level, ending the game after the last one.
+        """
+        if self.level == LEVELS:
+            self.end_game()
+            return
+        self.level += 1
+        self.hits = 0
+        self.pops = 0
+        self.popped = 0
+        self.deadlines = []
+        self.next_spawn = 0
+
+    def end_game(self):
+        """
+        Ends the game, for instance when the player quits.
+        """
+        if self.over:
+            return
+        self.over = True
+        self.active.clear()
+        if self.listeners:
+            self.emit('game_over', self.score, self.level)
+
+    def result(self):
+        """
+        :return: score: total score through the game
+                 level: last level played
+        """
+        return self.score, self.level
@@ -1,36 +1,138 @@
+import math
+import random
+import sys
+from collections import Counter
+from wack_engine import UniformSampler, WackEngine
 from wack_interface import *
+from wack_replay import record_game, replay_game
+from wack_scores import SCORES_FILE, ScoreStore
 
 
-def play_game():
+def play_game(record=None, scores_file=SCORES_FILE):
     """
     Runs the game! Displays the initial interface,
     then assigns a manner of playing (simulation or play
     themselves) and a politician, then plays the game
     based on those parameters. Whether the player chooses
     to play again or quit the game determines whether
-    the while loop continues or ends.
+    the while loop continues or ends. Every screen is a
+    scene of one window, built once and reused each round.
+    Every game's result is saved to the high score store.
+    :param record: file to log the player's games to for
+            replay_game, each game replacing the one before
+    :param scores_file: high score database to use
     :return: none
     """
-    going = True
-    while going:
-        go = InitialInterface()
-        manner = go.select_manner()
-        politician = go.select_politician()
-        go.close()
-        if manner == 'sim':
-            game = SimulationInterface(politician)
-        else:
-            game = GameInterface(politician)
-        game.start()
-        score = game.play()
-        end = FinalInterface(manner, score, politician)
-        going = end.close()
+    scores = ScoreStore(scores_file)
+    scores.compact()
+    stage = Stage('Wack-A-Politician')
+    try:
+        go = InitialInterface(stage)
+        games = {}  # (manner, politician) -> screen, built the first round it is needed
+        end = None
+        going = True
+        while going:
+            manner = go.select_manner()
+            politician = go.select_politician()
+            go.close()
+            game = games.get((manner, politician))
+            if game is None:
+                if manner == 'sim':
+                    game = SimulationInterface(politician, stage=stage, scores=scores)
+                else:
+                    game = GameInterface(politician, stage=stage, scores=scores)
+                games[manner, politician] = game
+            if manner == 'play' and record:
+                score = record_game(politician, record, game=game)
+            else:
+                game.reset()
+                game.start()
+                score = game.play()
+            if end is None:
+                end = FinalInterface(manner, score, politician, stage, scores)
+            else:
+                end.show_score(manner, score, politician)
+            going = end.close()
+            if going:
+                go.reset()
+        stage.close()
+    finally:
+        scores.close()
+
+
+def simulate_games(politician, seed, first, last):
+    """
+    Plays turbo simulations number first up to (not including) last.
+    Game i is seeded with seed and i alone, so its result does not
+    depend on which worker plays it. Runs in a worker process.
+    :return: list of (game number, score, level, game time) tuples
+    """
+    results = []
+    for i in range(first, last):
+        sampler = UniformSampler(random.Random('{}:{}'.format(seed, i)))
+        game = SimulationInterface(politician, turbo=True, engine=WackEngine(sampler))
+        score, level = game.play()
+        results.append((i, score, level, game.game_time))
+    return results
+
+
+def run_batch(games, politician, seed=0, workers=None, chunk_size=1000):
+    """
+    Plays games turbo simulations across a pool of worker processes,
+    yielding each game's result as its chunk finishes. Results come
+    back in completion order, not game order.
+    :param games: number of games to play
+    :param politician: politician tuple, as from select_politician
+    :param seed: seed for the whole batch
+    :param workers: number of processes, default one per core
+    :param chunk_size: games handed to a worker at a time
+    :return: generator of (game number, score, level, game time)
+    """
+    # imported here so that importing this module for scripting stays fast
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = [pool.submit(simulate_games, politician, seed, first, min(first + chunk_size, games))
+                  for first in range(0, games, chunk_size)]
+        for chunk in as_completed(chunks):
+            for result in chunk.result():
+                yield result
+
+
+def play_batch(games, politician=('Donald Trump', 'indianred', 'him', 'trump.gif'), seed=0, workers=None):
+    """
+    Plays a batch of simulations in parallel and sums up the results.
+    The same games and seed always give the same statistics.
+    :return: dictionary with the number of games, the score and level
+             distributions (value -> number of games), the mean score
+             and the mean game time in seconds (None if no games)
+    """
+    scores = Counter()
+    levels = Counter()
+    game_times = []
+    for i, score, level, game_time in run_batch(games, politician, seed, workers):
+        scores[score] += 1
+        levels[level] += 1
+        game_times.append(game_time)
+    return {'games': games,
+            'scores': dict(sorted(scores.items())),
+            'levels': dict(sorted(levels.items())),
+            'mean_score': sum(score * n for score, n in scores.items()) / games if games else None,
+            # fsum: same total in any order
+            'mean_time': math.fsum(game_times) / games if games else None}
 
 
 def main():
-    play_game()
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        games = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        print(play_batch(games, seed=seed))
+    elif len(sys.argv) > 2 and sys.argv[1] == 'record':
+        play_game(record=sys.argv[2])
+    elif len(sys.argv) > 2 and sys.argv[1] == 'replay':
+        print(replay_game(sys.argv[2], fast=sys.argv[3:] == ['fast']))
+    else:
+        play_game()
 
 
 if __name__ == '__main__':
     main()
-
@@ -1,6 +1,11 @@
 
-import random
+import math
 from graphics import *
+from wack_atlas import head_image, preload
+from wack_engine import WackEngine
+
+# Frames per second for animations in the game windows
+FRAME_RATE = 60
 
 
 class Button:
@@ -31,19 +36,25 @@ class Button:
         self.text.setStyle('bold')
         self.text.setTextColor(textColor)
         self.text.setSize(textSize)
+        self.window = None
 
     def draw(self, window):
         """
-        Draws the button.
+        Draws the button and makes it a click target of the window.
         :param window: graphics window
         """
         self.rect.draw(window)
         self.text.draw(window)
+        window.addTarget(self, self.upperleft, self.lowerright)
+        self.window = window
 
     def undraw(self):
         """
         Removes the button from the graphics window it is currently in.
         """
+        if self.window:
+            self.window.removeTarget(self)
+            self.window = None
         self.rect.undraw()
         self.text.undraw()
 
@@ -64,26 +75,71 @@ class Politician:
     """
     def __init__(self, point, politician_pic):
         """
-        Creates an image from a file and puts it at a point.
+        Creates an image of the head, from the sprite atlas, and puts
+        it at a point.
         :param point: Point(x, y) where head is drawn
         :param politician_pic: filename of image of head
         """
-        self.head = Image(point, politician_pic)
+        self.head = head_image(point, politician_pic)
         self.center = point
+        self.window = None
 
     def draw(self, window):
         """
-        Draws the head.
+        Draws the head. While it is drawn and not hidden, it is a
+        click target of the window.
         :param window: graphics window
         """
         self.head.draw(window)
+        self.window = window
+        self.update_target()
 
     def undraw(self):
         """
         Removes the button from the graphics window it is currently in.
         """
+        if self.window:
+            self.window.removeTarget(self)
+            self.window = None
         self.head.undraw()
 
+    def moveTo(self, point):
+        """
+        Moves the head so it is centered on a new point. Lets one
+        drawn head be reused for every pop instead of drawing a new one.
+        :param point: Point(x, y) where head should be
+        """
+        self.head.move(point.getX() - self.center.getX(), point.getY() - self.center.getY())
+        self.center = point
+        self.update_target()
+
+    def show(self):
+        """
+        Makes a hidden head visible again.
+        """
+        self.head.show()
+        self.update_target()
+
+    def hide(self):
+        """
+        Hides the head without removing it from the window.
+        """
+        self.head.hide()
+        self.update_target()
+
+    def update_target(self):
+        """
+        Keeps the window's click target for the head in step with
+        where the head is and whether it can be seen.
+        """
+        if not self.window:
+            return
+        if self.head.hidden:
+            self.window.removeTarget(self)
+        else:
+            self.window.addTarget(self, Point(self.center.getX() - 40, self.center.getY() - 40),
+                                  Point(self.center.getX() + 40, self.center.getY() + 40))
+
     def wasClicked(self, point):
         """
         Takes in a point from a cursor click and returns whether the
@@ -95,17 +151,121 @@ class Politician:
                and (self.center.getY() - 40 <= point.getY() <= self.center.getY() + 40)
 
 
-class InitialInterface:
+class Scoreboard:
+    """
+    Shows the current level and score. The text is drawn once and
+    changed in place, and only when the level or score changes.
+    """
+    def __init__(self, point):
+        """
+        Creates the scoreboard, blank until the first update.
+        :param point: Point(x, y) where the text is centered
+        """
+        self.text = Text(point, '')
+        self.text.setSize(18)
+        self.text.setStyle('bold')
+        self.level = None
+        self.score = None
+
+    def draw(self, window):
+        self.text.draw(window)
+
+    def clear(self):
+        """
+        Blanks the scoreboard, as before the first update.
+        """
+        self.level = None
+        self.score = None
+        self.text.setText('')
+
+    def update(self, level, score):
+        """
+        Shows a new level and score, with a single change to the
+        canvas if either is different from what is on screen.
+        :return: True if the text changed
+        """
+        if level == self.level and score == self.score:
+            return False
+        self.level = level
+        self.score = score
+        self.text.setText('Current level: ' + str(level) + '\nCurrent score: ' + str(score))
+        return True
+
+
+class Screen:
+    """
+    One screen of the game. On its own a screen gets a window of its
+    own. Given a Stage, it is instead a scene of that shared window,
+    which stays built after the game moves on, so it can be reset and
+    shown again in a later round.
+    """
+    def __init__(self, title, width, height, stage=None, autoflush=True):
+        """
+        :param title: window title while the screen is up
+        :param width: width of the screen
+        :param height: height of the screen
+        :param stage: Stage to show the screen on, if any
+        :param autoflush: False to draw changes only on commitFrame
+        """
+        self.title = title
+        self.stage = stage
+        if stage:
+            self.win = stage.scene(width, height, autoflush)
+        else:
+            self.win = GraphWin(title, width, height, autoflush=autoflush)
+        self.enter()
+
+    def enter(self):
+        """
+        Brings the screen up on its stage.
+        """
+        if self.stage:
+            self.stage.show(self.win, self.title)
+
+    def leave(self):
+        """
+        Done with the screen for now: closes its window, unless it is
+        on a stage, where the next screen shown takes its place.
+        """
+        if not self.stage:
+            self.win.close()
+
+    def quit_game(self):
+        """
+        Closes the screen's window, the whole stage if it is on one.
+        """
+        (self.stage or self.win).close()
+
+
+class GameScreen(Screen):
+    """
+    A screen a game is played on. Subclasses set self.name to the
+    politician's name and self.scores to a ScoreStore or None, even
+    when they make no window.
+    """
+    def save_score(self, manner, result):
+        """
+        Adds a finished game to the screen's high score store, if it
+        has one. This only queues the score, so it never holds the game up.
+        :param manner: 'sim' or 'play'
+        :param result: (score, level) the game ended with
+        """
+        if self.scores:
+            self.scores.add(self.name, manner, *result)
+
+
+class InitialInterface(Screen):
     """
     Sets up an intro screen, with buttons to pick a politician.
     """
-    def __init__(self):
+    def __init__(self, stage=None):
         """
         Creates buttons for each politician and displays text asking
         the player to first choose simulation or to play themselves,
         then to choose a politician.
+        :param stage: Stage to show the screen on, if any
         """
-        self.win = GraphWin('Wack-A-Politician', 400, 400)
+        Screen.__init__(self, 'Wack-A-Politician', 400, 400, stage)
         self.win.setBackground('blue')
 
         self.intro_text = Text(Point(200, 50), 'Welcome to Wack-A-Politician!')
@@ -129,9 +289,26 @@ class InitialInterface:
         self.bernie = Button(Point(210, 150), 100, 50, 'mediumseagreen', 'Bernie', 'black', 15)
         self.obama = Button(Point(210, 220), 100, 50, 'deeppink', 'Obama', 'black', 15)
         self.pence = Button(Point(210, 290), 100, 50, 'khaki', 'Mike Pence', 'black', 15)
+        self.politicians = {self.trump: ('Donald Trump', 'indianred', 'him', 'trump.gif'),
+                            self.carson: ('Ben Carson', 'indianred', 'him', 'carson.gif'),
+                            self.hillary: ('Hillary Clinton', 'royalblue', 'her', 'hillary.gif'),
+                            self.bernie: ('Bernie Sanders', 'royalblue', 'him', 'bernie.gif'),
+                            self.obama: ('Barack Obama', 'royalblue', 'him', 'obama.gif'),
+                            self.pence: ('Mike Pence', 'indianred', 'him', 'pence.gif')}
 
         self.quit = Button(Point(0, 0), 60, 20, 'limegreen', 'QUIT GAME', 'yellow', 10)
         self.quit.draw(self.win)
+        preload()
+
+    def reset(self):
+        """
+        Puts the screen back the way it started, for another round.
+        """
+        for button in self.politicians:
+            button.undraw()
+        self.sim.draw(self.win)
+        self.playing.draw(self.win)
+        self.enter()
 
     def select_manner(self):
         """
@@ -140,33 +317,13 @@ class InitialInterface:
         alternating background.
         :return: a string, either 'sim' or 'play'
         """
-        start_time = time.time()
-        manner = ''
-        keep_running = True
-        while keep_running:
-            new_time = time.time()
-            if int(new_time - start_time) % 4 == 0:
-                self.win.setBackground('blue')
-            elif int(new_time - start_time) % 2 == 0:
-                self.win.setBackground('red')
-            else:
-                click = self.win.checkMouse()
-                if click is not None:
-                    if self.sim.wasClicked(click):
-                        self.sim.undraw()
-                        self.playing.undraw()
-                        manner = 'sim'
-                        keep_running = False
-                    elif self.playing.wasClicked(click):
-                        self.sim.undraw()
-                        self.playing.undraw()
-                        manner = 'play'
-                        keep_running = False
-                    elif self.quit.wasClicked(click):
-                        keep_running = False
-                        self.win.close()
-                    else:
-                        pass
+        self.start_blinking()
+        self.win.setMouseHandler(self.manner_clicked)
+        manner = self.win.wait()
+        self.win.setMouseHandler(None)
+        self.stop_blinking()
+        self.sim.undraw()
+        self.playing.undraw()
         self.trump.draw(self.win)
         self.carson.draw(self.win)
         self.hillary.draw(self.win)
@@ -175,6 +332,19 @@ class InitialInterface:
         self.pence.draw(self.win)
         return manner
 
+    def manner_clicked(self, click):
+        """
+        Mouse handler while the manner of playing is being chosen.
+        :param click: Point(x, y) from cursor click
+        """
+        target = self.win.targetAt(click)
+        if target is self.sim:
+            self.win.stopWaiting('sim')
+        elif target is self.playing:
+            self.win.stopWaiting('play')
+        elif target is self.quit:
+            self.quit_game()
+
     def select_politician(self):
         """
         Waits for the user to select a politician, while alternating
@@ -184,56 +354,77 @@ class InitialInterface:
                  pronoun of politician
                  filename of politician head
         """
-        start_time = time.time()
-        self.win.setBackground('blue')
-        keep_running = True
-        while keep_running:
-            new_time = time.time()
-            if int(new_time - start_time) % 4 == 0:
-                self.win.setBackground('blue')
-            elif int(new_time - start_time) % 2 == 0:
-                self.win.setBackground('red')
-            else:
-                click = self.win.checkMouse()
-                if click is not None:
-                    if self.trump.wasClicked(click):
-                        return 'Donald Trump', 'indianred', 'him', 'trump.gif'
-                    elif self.carson.wasClicked(click):
-                        return 'Ben Carson', 'indianred', 'him', 'carson.gif'
-                    elif self.hillary.wasClicked(click):
-                        return 'Hillary Clinton', 'royalblue', 'her', 'hillary.gif'
-                    elif self.bernie.wasClicked(click):
-                        return 'Bernie Sanders', 'royalblue', 'him', 'bernie.gif'
-                    elif self.obama.wasClicked(click):
-                        return 'Barack Obama', 'royalblue', 'him', 'obama.gif'
-                    elif self.pence.wasClicked(click):
-                        return 'Mike Pence', 'indianred', 'him', 'pence.gif'
-                    elif self.quit.wasClicked(click):
-                        keep_running = False
-                        self.win.close()
-                    else:
-                        pass
+        self.start_blinking()
+        self.win.setMouseHandler(self.politician_clicked)
+        politician = self.win.wait()
+        self.win.setMouseHandler(None)
+        self.stop_blinking()
+        return politician
+
+    def politician_clicked(self, click):
+        """
+        Mouse handler while a politician is being chosen.
+        :param click: Point(x, y) from cursor click
+        """
+        target = self.win.targetAt(click)
+        if target in self.politicians:
+            self.win.stopWaiting(self.politicians[target])
+        elif target is self.quit:
+            self.quit_game()
+
+    def start_blinking(self):
+        """
+        Starts alternating the background between blue and red,
+        switching every two seconds.
+        """
+        self.background = 'blue'
+        self.win.setBackground(self.background)
+        self.blink_timer = self.win.after(2000, self.blink)
+
+    def blink(self):
+        """
+        Timer callback that switches the background color.
+        """
+        if self.win.isClosed():
+            return
+        self.background = 'red' if self.background == 'blue' else 'blue'
+        self.win.setBackground(self.background)
+        self.blink_timer = self.win.after(2000, self.blink)
+
+    def stop_blinking(self):
+        """
+        Cancels the pending background switch.
+        """
+        if not self.win.isClosed():
+            self.win.after_cancel(self.blink_timer)
 
     def close(self):
-        self.win.close()
+        self.leave()
 
 
-class GameInterface:
+class GameInterface(GameScreen):
     """
     Plays the actual game in a window. The parameter determines
     the color of the background and the head that pops up.
     Includes a quit button that can be clicked at any time
-    during the game.
+    during the game. Shows as many heads at once as the engine
+    lets up, each with its own timer.
     """
-    def __init__(self, politician):
+    def __init__(self, politician, engine=None, stage=None, scores=None):
         """
         Creates window, quit button, start button, next level button,
         politician head, and initial score.
         :param politician: list of attributes: politician name,
                 politician background color, politician pronoun,
                 politician head filename
+        :param engine: WackEngine to play, a new one if not given
+        :param stage: Stage to show the screen on, if any
+        :param scores: ScoreStore to save finished games to, if any
         """
-        self.win = GraphWin('Play Wack-A-Politician', 800, 800)
+        self.engine = engine or WackEngine()
+        self.name = politician[0]
+        self.scores = scores
+        Screen.__init__(self, 'Play Wack-A-Politician', 800, 800, stage, autoflush=False)
         self.win.setBackground(politician[1])
         self.instructions = Text(Point(400, 70), 'Use your mouse to WACK ' + politician[0] +
                                  ' on the head!\n\nHit ' + politician[2] + ' as many times as possible '
@@ -248,120 +439,177 @@ class GameInterface:
         self.start_button = Button(Point(350, 400), 100, 50, 'lawngreen', 'Start!', 'saddlebrown', 15)
         self.start_button.draw(self.win)
 
-        self.hole1 = Circle(Point(175, 300), 25)
-        self.hole2 = Circle(Point(325, 300), 25)
-        self.hole3 = Circle(Point(475, 300), 25)
-        self.hole4 = Circle(Point(625, 300), 25)
-        self.hole5 = Circle(Point(175, 450), 25)
-        self.hole6 = Circle(Point(325, 450), 25)
-        self.hole7 = Circle(Point(475, 450), 25)
-        self.hole8 = Circle(Point(625, 450), 25)
-        self.hole9 = Circle(Point(175, 600), 25)
-        self.hole10 = Circle(Point(325, 600), 25)
-        self.hole11 = Circle(Point(475, 600), 25)
-        self.hole12 = Circle(Point(625, 600), 25)
-        self.hole1.setFill('dimgrey')
-        self.hole2.setFill('dimgrey')
-        self.hole3.setFill('dimgrey')
-        self.hole4.setFill('dimgrey')
-        self.hole5.setFill('dimgrey')
-        self.hole6.setFill('dimgrey')
-        self.hole7.setFill('dimgrey')
-        self.hole8.setFill('dimgrey')
-        self.hole9.setFill('dimgrey')
-        self.hole10.setFill('dimgrey')
-        self.hole11.setFill('dimgrey')
-        self.hole12.setFill('dimgrey')
+        board = self.engine.board
+        self.holes = Circles(board.centers, board.radius)
+        self.holes.setFill('dimgrey')
+        self.holes.hide()
+        self.holes.draw(self.win)
 
         self.next_level_button = Button(Point(350, 400), 100, 50, 'lawngreen', 'Next Level', 'saddlebrown', 15)
         self.image = politician[3]
-        self.face = Politician(Point(400, 400), self.image)
+        self.face = self.new_face()
+        self.faces = {}  # hole -> head shown there
+        self.spare_faces = [self.face]  # drawn but hidden heads, ready to pop
+        self.timer = None
+        self.due = None  # when the engine wants the timer to fire
+        self.engine.listeners.append(self.engine_event)
 
-        self.score_display = Text(Point(400, 175), 'Current level: ' + str(0)
-                                  + '\nCurrent score: ' + str(0))
-        self.x = 0
-        self.y = 0
+        self.score_display = Scoreboard(Point(400, 175))
+        self.score_display.draw(self.win)
+
+    def reset(self, engine=None):
+        """
+        Puts the screen back the way it started, for another game
+        against the same politician.
+        :param engine: WackEngine to play, a new one if not given
+        """
+        self.cancel_timer()
+        self.engine = engine or WackEngine()
+        self.engine.listeners.append(self.engine_event)
+        board = self.engine.board
+        if board.centers != self.holes.centers or board.radius != self.holes.radius:
+            self.holes.undraw()
+            self.holes = Circles(board.centers, board.radius)
+            self.holes.setFill('dimgrey')
+            self.holes.draw(self.win)
+        self.holes.hide()
+        for face in self.faces.values():
+            face.hide()
+            self.spare_faces.append(face)
+        self.faces.clear()
+        self.next_level_button.undraw()
+        self.start_button.undraw()
+        self.start_button.draw(self.win)
+        self.score_display.clear()
+        self.enter()
+        self.win.commitFrame()
 
     def start(self):
         """
         Starts the game, or quits the game.
         """
-        click = self.win.getMouse()
-        if self.start_button.wasClicked(click):
+        target = self.win.targetAt(self.win.getMouse())
+        if target is self.start_button:
             self.start_button.undraw()
-        elif self.quit.wasClicked(click):
+        elif target is self.quit:
             self.close()
         else:
             self.start()
 
     def draw_holes(self):
-        self.hole1.draw(self.win)
-        self.hole2.draw(self.win)
-        self.hole3.draw(self.win)
-        self.hole4.draw(self.win)
-        self.hole5.draw(self.win)
-        self.hole6.draw(self.win)
-        self.hole7.draw(self.win)
-        self.hole8.draw(self.win)
-        self.hole9.draw(self.win)
-        self.hole10.draw(self.win)
-        self.hole11.draw(self.win)
-        self.hole12.draw(self.win)
+        self.holes.show()
 
     def undraw_holes(self):
-        self.hole1.undraw()
-        self.hole2.undraw()
-        self.hole3.undraw()
-        self.hole4.undraw()
-        self.hole5.undraw()
-        self.hole6.undraw()
-        self.hole7.undraw()
-        self.hole8.undraw()
-        self.hole9.undraw()
-        self.hole10.undraw()
-        self.hole11.undraw()
-        self.hole12.undraw()
-
-    def new_spot(self):
-        """
-        Finds the next spot for the head, making sure it is not
-        in the same row or column, let alone the same space, as
-        the head before. No return value, reassigns self.x and self.y
-        """
-        x, y = random.choice([175, 325, 475, 625]), random.choice([300, 450, 600])
-        if x == self.x or y == self.y:
-            self.new_spot()
-        else:
-            self.x, self.y = x, y
+        self.holes.hide()
 
-    def head_pop(self, level):
+    def new_face(self):
         """
-        Draws a politician head in a new spot, then waits for either
-        time to run out or the head to get clicked (or quit button to
-        get clicked). Time runs out faster for higher levels.
-        :param level: current level of game.
-        :return: count for that level
+        Draws another hidden head, for when more heads are up at
+        once than have been drawn before.
+        :return: Politician head
         """
-        count = 0
-        start_time = time.time()
-        self.new_spot()
-        self.face = Politician(Point(self.x, self.y), self.image)
-        self.face.draw(self.win)
-        keep_running = True
-        while keep_running:
-            new_time = time.time()
-            if new_time - start_time >= (11 - level) / 5:
-                keep_running = False
-            else:
-                click = self.win.checkMouse()
-                if click is not None:
-                    if self.face.wasClicked(click):
-                        count += 1
-                        keep_running = False
-                    elif self.quit.wasClicked(click):
-                        self.close()
-        self.face.undraw()
-        return count
+        face = Politician(Point(400, 400), self.image)
+        face.hide()
+        face.draw(self.win)
+        return face
+
+    def engine_event(self, kind, *values):
+        """
+        Engine listener that shows a head when it pops up and hides
+        it again once it is hit or missed. Heads are reused, so no
+        image is drawn or deleted during a game.
+        """
+        if kind == 'pop':
+            recorder = getRecorder()
+            if recorder:
+                start = recorder.clock()
+            level, x, y, hole = values
+            face = self.spare_faces.pop() if self.spare_faces else self.new_face()
+            face.hole = hole
+            self.faces[hole] = face
+            face.moveTo(Point(x, y))
+            face.show()
+            self.win.commitFrame()
+            if recorder:
+                recorder.record('pop', start, recorder.clock() - start)
+        elif kind == 'hit' or kind == 'miss':
+            face = self.faces.pop(values[-1])
+            face.hide()
+            self.spare_faces.append(face)
+            self.update(self.engine.level, self.engine.score)
+
+    def play_level(self):
+        """
+        Plays one level. Heads pop up and time out on timers set
+        from the engine's schedule, and clicks are handled as they
+        come in, until every head of the level has come down (or
+        quit button gets clicked). Time runs out faster for higher
+        levels.
+        """
+        self.win.setMouseHandler(self.head_clicked)
+        self.tick()
+        self.win.wait()
+        self.win.setMouseHandler(None)
+        self.cancel_timer()
+
+    def tick(self):
+        """
+        Lets the engine time out and pop heads, then sets a timer
+        for the next time it has something to do. If timings are
+        being recorded, records how late the timer fired as 'late'.
+        """
+        now = clock()
+        self.record_lateness(now)
+        self.timer = None
+        game = self.engine
+        game.tick(now)
+        if game.over or game.level_done():
+            self.win.stopWaiting()
+            return
+        self.due = game.next_time()
+        # rounded up, so the timer never fires before the engine's time
+        delay = max(0, math.ceil((self.due - clock()) * 1000))
+        self.timer = self.win.after(delay, self.tick)
+
+    def record_lateness(self, now):
+        """
+        Records how long after self.due the time now is, if a timer
+        was due and timings are being recorded. Both are read from
+        clock(), the clock the engine's deadlines are on, so under the
+        headless backend timers are never late; only the start of the
+        sample is put on the recorder's clock, to line up with the rest.
+        :param now: time from clock()
+        """
+        recorder = getRecorder()
+        if recorder and self.due is not None:
+            late = now - self.due
+            recorder.record('late', recorder.clock() - late, late)
+        self.due = None
+
+    def cancel_timer(self):
+        self.due = None
+        if self.timer:
+            self.win.after_cancel(self.timer)
+            self.timer = None
+
+    def head_clicked(self, click):
+        """
+        Mouse handler while heads are up. Hitting a head takes it
+        down, which may let the next one pop up sooner.
+        :param click: Point(x, y) from cursor click
+        """
+        recorder = getRecorder()
+        if recorder:
+            start = recorder.clock()
+        target = self.win.targetAt(click)
+        if isinstance(target, Politician):
+            self.engine.hit(target.hole)
+            self.cancel_timer()
+            self.tick()
+            if recorder:
+                recorder.record('hit', start, recorder.clock() - start)
+        elif target is self.quit:
+            self.close()
 
     def update(self, new_level, new_score):
         """
@@ -370,69 +618,137 @@ class GameInterface:
         :param new_score: new total score
         :return: none
         """
-        if self.score_display:
-            self.score_display.undraw()
-        self.score_display = Text(Point(400, 175), 'Current level: ' + str(new_level)
-                                  + '\nCurrent score: ' + str(new_score))
-        self.score_display.setSize(18)
-        self.score_display.setStyle('bold')
-        self.score_display.draw(self.win)
+        recorder = getRecorder()
+        if recorder:
+            start = recorder.clock()
+        self.score_display.update(new_level, new_score)
+        self.win.commitFrame()
+        if recorder:
+            recorder.record('score', start, recorder.clock() - start)
 
     def play(self):
         """
         Plays the game, up to 10 levels. Ends the game if the player does
-        not hit the head enough times in a given level.
+        not hit the head enough times in a given level. If timings are
+        being recorded (see graphics.Recorder), saves them at the end,
+        and the result goes to the high score store if there is one.
         :return: score: total score through the game
                  level: last level the player was on
         """
-        score = 0
-        level = 1
-        self.update(level, score)
-        while level < 11:
-            count = 0
+        game = self.engine
+        self.update(game.level, game.score)
+        while not game.over:
             self.draw_holes()
-            for i in range(8):
-                count += self.head_pop(level)
-                self.update(level, score + count)
-            score += count
-            if count < 4:
+            self.play_level()
+            if game.over:
                 break
             self.undraw_holes()
             self.next_level_button.draw(self.win)
-            click = self.win.getMouse()
-            if self.next_level_button.wasClicked(click):
-                level += 1
-                self.update(level, score)
+            if self.win.targetAt(self.win.getMouse()) is self.quit:
+                game.end_game()
+            else:
+                game.next_level()
+                self.update(game.level, game.score)
                 self.next_level_button.undraw()
-            elif self.quit.wasClicked(click):
+        self.leave()
+        if getRecorder():
+            getRecorder().save()
+        self.save_score('play', game.result())
+        return game.result()
+
+    async def play_async(self):
+        """
+        Plays the game like play(), as a coroutine to run with
+        graphics_asyncio.run. Each step awaits either a click or
+        the next head timing out, so other asyncio tasks can run
+        in the same thread meanwhile. Clicking quit ends the game.
+        :return: score: total score through the game
+                 level: last level the player was on
+        """
+        import asyncio
+        game = self.engine
+        self.update(game.level, game.score)
+        while not game.over:
+            self.draw_holes()
+            game.tick(clock())
+            while not (game.over or game.level_done()):
+                click = self.win.mouse()
+                self.due = game.next_time()
+                timeout = self.win.timer(max(0, math.ceil((self.due - clock()) * 1000)))
+                await asyncio.wait([click, timeout], return_when=asyncio.FIRST_COMPLETED)
+                if timeout.done():
+                    self.record_lateness(clock())
+                timeout.cancel()
+                self.due = None
+                if click.done():
+                    target = self.win.targetAt(click.result())
+                    if isinstance(target, Politician):
+                        game.hit(target.hole)
+                    elif target is self.quit:
+                        game.end_game()
+                else:
+                    click.cancel()
+                game.tick(clock())
+            if game.over:
                 break
+            self.undraw_holes()
+            self.next_level_button.draw(self.win)
+            if self.win.targetAt(await self.win.mouse()) is self.quit:
+                game.end_game()
             else:
-                level += 1
-                self.update(level, score)
+                game.next_level()
+                self.update(game.level, game.score)
                 self.next_level_button.undraw()
-        self.win.close()
-        if level == 11:
-            level = 10
-        return score, level
+        self.leave()
+        if getRecorder():
+            getRecorder().save()
+        self.save_score('play', game.result())
+        return game.result()
+
+    def leave(self):
+        self.cancel_timer()
+        Screen.leave(self)
 
     def close(self):
-        self.win.close()
+        self.cancel_timer()
+        self.quit_game()
 
 
-class SimulationInterface:
+class SimulationInterface(GameScreen):
     """
     Simulates the game in a new window. The parameter determines
     the color of the background and the head that pops up.
     """
-    def __init__(self, politician):
+    def __init__(self, politician, turbo=False, engine=None, stage=None, scores=None):
         """
         Creates window, quit button, start button, next level button,
         politician head, and initial score.
+        In turbo mode no window is made; play() just works out
+        where the heads pop and when the bot would hit them.
+        Either way the bot misses a head that goes down before it
+        gets there, which only happens once head times are shorter
+        than its travel times (level 10 on the default curve).
         :param politician: list of attributes: politician name,
                 politician background color, politician pronoun,
                 politician head filename
+        :param turbo: True to skip drawing, animation and pauses
+        :param engine: WackEngine to play, a new one if not given
+        :param stage: Stage to show the screen on, if any
+        :param scores: ScoreStore to save finished games to, if any
         """
-        self.win = GraphWin('Play Wack-A-Politician', 800, 800)
+        self.turbo = turbo
+        self.name = politician[0]
+        self.scores = scores
+        self.image = politician[3]
+        self.engine = engine or WackEngine()
+        self.timeline = []
+        self.game_time = 0.0  # length of the last game played, in seconds
+        self.botx = 400
+        self.boty = 400
+        if turbo:
+            return
+
+        Screen.__init__(self, 'Play Wack-A-Politician', 800, 800, stage, autoflush=False)
         self.win.setBackground(politician[1])
         self.instructions = Text(Point(400, 70), 'Watch this bot WACK ' + politician[0] +
                                  ' on the head!\n\nHit ' + politician[2] + ' as many times as possible, bot!')
@@ -446,138 +762,134 @@ class SimulationInterface:
         self.start_button = Button(Point(350, 400), 100, 50, 'lawngreen', 'Start!', 'saddlebrown', 15)
         self.start_button.draw(self.win)
 
-        self.hole1 = Circle(Point(175, 300), 25)
-        self.hole2 = Circle(Point(325, 300), 25)
-        self.hole3 = Circle(Point(475, 300), 25)
-        self.hole4 = Circle(Point(625, 300), 25)
-        self.hole5 = Circle(Point(175, 450), 25)
-        self.hole6 = Circle(Point(325, 450), 25)
-        self.hole7 = Circle(Point(475, 450), 25)
-        self.hole8 = Circle(Point(625, 450), 25)
-        self.hole9 = Circle(Point(175, 600), 25)
-        self.hole10 = Circle(Point(325, 600), 25)
-        self.hole11 = Circle(Point(475, 600), 25)
-        self.hole12 = Circle(Point(625, 600), 25)
-        self.hole1.setFill('dimgrey')
-        self.hole2.setFill('dimgrey')
-        self.hole3.setFill('dimgrey')
-        self.hole4.setFill('dimgrey')
-        self.hole5.setFill('dimgrey')
-        self.hole6.setFill('dimgrey')
-        self.hole7.setFill('dimgrey')
-        self.hole8.setFill('dimgrey')
-        self.hole9.setFill('dimgrey')
-        self.hole10.setFill('dimgrey')
-        self.hole11.setFill('dimgrey')
-        self.hole12.setFill('dimgrey')
+        board = self.engine.board
+        self.holes = Circles(board.centers, board.radius)
+        self.holes.setFill('dimgrey')
+        self.holes.hide()
+        self.holes.draw(self.win)
 
         self.next_level_button = Button(Point(350, 400), 100, 50, 'lawngreen', 'Next Level', 'saddlebrown', 15)
-        self.image = politician[3]
         self.face = Politician(Point(400, 400), self.image)
+        self.face.hide()
+        self.face.draw(self.win)
+
+        self.score_display = Scoreboard(Point(400, 175))
+        self.score_display.draw(self.win)
 
-        self.score_display = Text(Point(400, 175), 'Current level: ' + str(0)
-                                  + '\nCurrent score: ' + str(0))
-        self.x = 0
-        self.y = 0
+        self.bot = Circle(Point(self.botx, self.boty), 7)
+        self.bot.setFill('yellow')
+        self.bot.hide()
+        self.bot.draw(self.win)
 
+    def reset(self, engine=None):
+        """
+        Puts the screen back the way it started, for another game
+        against the same politician.
+        :param engine: WackEngine to play, a new one if not given
+        """
+        self.engine = engine or WackEngine()
+        self.timeline = []
+        self.game_time = 0.0
+        if self.turbo:
+            return
+        self.bot.move(400 - self.botx, 400 - self.boty)
         self.botx = 400
         self.boty = 400
-
-        self.bot = Circle(Point(self.botx, self.boty), 7)
-        self.bot.setFill('purple')
+        self.holes.hide()
+        self.face.hide()
+        self.next_level_button.undraw()
+        self.start_button.undraw()
+        self.start_button.draw(self.win)
+        self.quit.undraw()
+        self.quit.draw(self.win)
+        self.score_display.clear()
+        self.enter()
+        self.win.commitFrame()
 
     def start(self):
         """
         Starts the simulation, or quits the simulation.
         """
-        click = self.win.getMouse()
-        if self.start_button.wasClicked(click):
+        if self.turbo:
+            return
+        target = self.win.targetAt(self.win.getMouse())
+        if target is self.start_button:
             self.start_button.undraw()
             self.quit.undraw()
-        elif self.quit.wasClicked(click):
+        elif target is self.quit:
             self.close()
         else:
             self.start()
 
     def draw_holes(self):
-        self.hole1.draw(self.win)
-        self.hole2.draw(self.win)
-        self.hole3.draw(self.win)
-        self.hole4.draw(self.win)
-        self.hole5.draw(self.win)
-        self.hole6.draw(self.win)
-        self.hole7.draw(self.win)
-        self.hole8.draw(self.win)
-        self.hole9.draw(self.win)
-        self.hole10.draw(self.win)
-        self.hole11.draw(self.win)
-        self.hole12.draw(self.win)
+        self.holes.show()
 
     def undraw_holes(self):
-        self.hole1.undraw()
-        self.hole2.undraw()
-        self.hole3.undraw()
-        self.hole4.undraw()
-        self.hole5.undraw()
-        self.hole6.undraw()
-        self.hole7.undraw()
-        self.hole8.undraw()
-        self.hole9.undraw()
-        self.hole10.undraw()
-        self.hole11.undraw()
-        self.hole12.undraw()
-
-    def new_spot(self):
-        """
-        Finds the next spot for the head, making sure it is not
-        in the same row or column, let alone the same space, as
-        the head before. No return value, reassigns self.x and self.y
-        """
-        x, y = random.choice([175, 325, 475, 625]), random.choice([300, 450, 600])
-        if x == self.x or y == self.y:
-            self.new_spot()
-        else:
-            self.x, self.y = x, y
+        self.holes.hide()
 
-    def move_bot(self, x, y):
+    def move_bot(self, x, y, head_time=None):
         """
         Gets the bot to go towards the next spot once the head pops up.
+        The bot's position is interpolated from the time elapsed since
+        it set off, so its speed does not depend on how fast frames are
+        drawn, and it always ends exactly on (x, y).
+        :param head_time: seconds after which the head goes down, if
+                that may happen before the bot gets there
         """
-        changeX = x - self.botx
-        changeY = y - self.boty
-        dist = (changeX**2 + changeY**2) **(1/2)
-        if dist < 250:
-            scalar = 10
-        elif dist < 350:
-            scalar = 12
+        startX, startY = self.botx, self.boty
+        changeX = x - startX
+        changeY = y - startY
+        duration = self.travel_time(x, y)
+        self.bot.show()
+        start_time = clock()
+        done = 0
+        while done < 1:
+            done = min((clock() - start_time) / duration, 1)
+            if done < 1:
+                newX, newY = startX + changeX * done, startY + changeY * done
+            else:
+                newX, newY = x, y
+            self.bot.move(newX - self.botx, newY - self.boty)
+            self.botx, self.boty = newX, newY
+            if head_time is not None and clock() - start_time >= head_time:
+                self.face.hide()
+            self.win.commitFrame(FRAME_RATE)
+            update()  # nothing else handles input while the bot moves
+        self.bot.hide()
+
+    def travel_time(self, x, y):
+        """
+        How long the bot takes to get from where it is to (x, y).
+        Farther spots take longer, but not proportionally so.
+        :return: travel time in seconds
+        """
+        dist_squared = (x - self.botx)**2 + (y - self.boty)**2
+        if dist_squared < 250**2:
+            return 1 / 6
+        elif dist_squared < 350**2:
+            return 0.2
         else:
-            scalar = 15
-        self.bot = Circle(Point(self.botx, self.boty), 7)
-        self.bot.setFill('yellow')
-        self.bot.draw(self.win)
-        while self.botx != x and self.boty != y:
-            self.bot.undraw()
-            self.botx += changeX/scalar
-            self.boty += changeY/scalar
-            self.bot = Circle(Point(self.botx, self.boty), 7)
-            self.bot.setFill('yellow')
-            self.bot.draw(self.win)
-        self.bot.undraw()
+            return 0.25
 
     def head_pop(self):
         """
-        Draws a politician head in a new spot, then waits for
-        bot to reach it.
-        :return: count for that level
+        Pops a head up where the engine puts it, then waits for
+        bot to reach it. The bot hits it if it gets there within the
+        head time, and misses it otherwise.
+        :return: True if the bot hit the head
         """
-        count = 0
-        self.new_spot()
-        self.face = Politician(Point(self.x, self.y), self.image)
-        self.face.draw(self.win)
-        self.move_bot(self.x, self.y)
-        count += 1
-        self.face.undraw()
-        return count
+        x, y = self.engine.pop()
+        in_time = self.travel_time(x, y) <= self.engine.head_time()
+        self.face.moveTo(Point(x, y))
+        self.face.show()
+        self.win.commitFrame()
+        self.move_bot(x, y, None if in_time else self.engine.head_time())
+        if in_time:
+            self.engine.hit()
+        else:
+            self.engine.miss()
+        self.face.hide()
+        return in_time
 
     def update(self, new_level, new_score):
         """
@@ -586,56 +898,95 @@ class SimulationInterface:
         :param new_score: new total score
         :return: none
         """
-        if self.score_display:
-            self.score_display.undraw()
-        self.score_display = Text(Point(400, 175), 'Current level: ' + str(new_level)
-                                  + '\nCurrent score: ' + str(new_score))
-        self.score_display.setSize(18)
-        self.score_display.setStyle('bold')
-        self.score_display.draw(self.win)
+        self.score_display.update(new_level, new_score)
+        self.win.commitFrame()
 
     def play(self):
         """
-        Plays the game, up to 10 levels.
+        Plays the game, up to 10 levels. Each hit is added to
+        self.timeline as (time into game, level, x, y), and the length
+        of the game is kept in self.game_time. The result
+        goes to the high score store if there is one.
         :return: score: total score at end of simulation
                  level: last level the bot was on
         """
-        score = 0
-        level = 1
-        self.update(level, score)
-        while level < 11:
+        if self.turbo:
+            result = self.play_turbo()
+            self.save_score('sim', result)
+            return result
+        game = self.engine
+        start_time = clock()
+        self.update(game.level, game.score)
+        while not game.over:
             self.draw_holes()
-            count = 0
-            for i in range(8):
-                count += self.head_pop()
-                self.update(level, score + count)
-            score += count
+            while not game.level_done():
+                if self.head_pop():
+                    self.timeline.append((clock() - start_time, game.level, game.x, game.y))
+                self.update(game.level, game.score)
             self.undraw_holes()
+            if game.over:
+                break
             self.next_level_button.draw(self.win)
-            time.sleep(0.4)
+            self.win.commitFrame()
+            self.win.after(400, self.win.stopWaiting)
+            self.win.wait()
             self.next_level_button.undraw()
-            level += 1
-            self.update(level, score)
-        self.win.close()
-        return score, level - 1
+            game.next_level()
+            self.update(game.level, game.score)
+        self.game_time = clock() - start_time
+        self.leave()
+        self.save_score('sim', game.result())
+        return game.result()
+
+    def play_turbo(self):
+        """
+        Plays the game like play(), without drawing anything or
+        waiting. Times in self.timeline and self.game_time add up the
+        bot's travel times and pauses exactly, so they come out a little
+        shorter than in an animated game, whose moves end on the first
+        frame after the bot arrives.
+        :return: score: total score at end of simulation
+                 level: last level the bot was on
+        """
+        game = self.engine
+        game_time = 0.0
+        while not game.over:
+            x, y = game.pop()
+            travel_time = self.travel_time(x, y)
+            game_time += travel_time
+            self.botx, self.boty = x, y
+            if travel_time <= game.head_time():
+                game.hit()
+                self.timeline.append((game_time, game.level, x, y))
+            else:
+                game.miss()
+            if game.level_done() and not game.over:
+                game_time += 0.4
+                game.next_level()
+        self.game_time = game_time
+        return game.result()
 
     def close(self):
-        self.win.close()
+        if self.turbo:
+            return
+        self.quit_game()
 
 
-class FinalInterface:
+class FinalInterface(Screen):
     """
     Creates a final screen, with final score and
     option to quit or play again.
     """
-    def __init__(self, manner, score, politician):
+    def __init__(self, manner, score, politician, stage=None, scores=None):
         """
         Creates a window with the politician's background color
         :param score:
         :param politician:
+        :param stage: Stage to show the screen on, if any
+        :param scores: ScoreStore to rank the score against, if any
         """
-        self.win = GraphWin('Wack-A-Politician', 400, 400)
-        self.win.setBackground(politician[1])
+        Screen.__init__(self, 'Wack-A-Politician', 400, 400, stage)
+        self.scores = scores
 
         self.quit = Button(Point(150, 250), 100, 40, 'limegreen', 'QUIT GAME', 'yellow', 15)
         self.quit.text.setStyle('bold')
@@ -644,40 +995,52 @@ class FinalInterface:
         self.play.text.setStyle('bold')
         self.play.draw(self.win)
 
+        self.score = Text(Point(200, 100), '')
+        self.score.setSize(20)
+        self.score.draw(self.win)
+        self.show_score(manner, score, politician)
+
+    def show_score(self, manner, score, politician):
+        """
+        Shows how a game went, for a new game if the screen is reused.
+        :param manner: 'sim' or 'play'
+        :param score: (score, level) the game ended with
+        :param politician: politician tuple the game was played with
+        """
+        self.win.setBackground(politician[1])
         if manner == 'play':
             if score[1] < 4 or score[0] <= 20:
-                self.score = Text(Point(200, 100), 'You ended on level ' + str(score[1])
-                                  + '.\nYikes! Looks like wacking is not your thing.\nYou only hit '
-                                  + politician[0] + ' ' + str(score[0])
-                                  + ' times!\nLame! You can do better than that.')
-                self.score.setSize(20)
-                self.score.draw(self.win)
+                self.score.setText('You ended on level ' + str(score[1])
+                                   + '.\nYikes! Looks like wacking is not your thing.\nYou only hit '
+                                   + politician[0] + ' ' + str(score[0])
+                                   + ' times!\nLame! You can do better than that.')
             else:
-                self.score = Text(Point(200, 100), 'You ended on level ' + str(score[1])
-                                  + '.\nLooks like wacking is your calling!\nWow! You hit '
-                                  + politician[0] + ' '+ str(score[0]) + ' times!')
-                self.score.setSize(20)
-                self.score.draw(self.win)
+                self.score.setText('You ended on level ' + str(score[1])
+                                   + '.\nLooks like wacking is your calling!\nWow! You hit '
+                                   + politician[0] + ' '+ str(score[0]) + ' times!')
         else:
-            self.score = Text(Point(200, 100), 'The bot ended on level ' + str(score[1])
-                              + '.\nLooks like wacking is its calling!\nWow! It hit '
-                              + politician[0] + ' ' + str(score[0]) + ' times!\nCan YOU do that?')
-            self.score.setSize(20)
-            self.score.draw(self.win)
+            self.score.setText('The bot ended on level ' + str(score[1])
+                               + '.\nLooks like wacking is its calling!\nWow! It hit '
+                               + politician[0] + ' ' + str(score[0]) + ' times!\nCan YOU do that?')
+        ranking = self.scores.rank(politician[0], manner, score[0]) if self.scores else None
+        if ranking and ranking[0] is not None:
+            self.score.setText(self.score.getText() + '\nBetter than {:.0f}% of games, best {}.'
+                               .format(*ranking))
+        self.enter()
 
     def close(self):
         """
         Waits for user to choose to quit or play again.
         :return: True or False
         """
-        click = self.win.getMouse()
-        if self.quit.wasClicked(click):
-            self.win.close()
+        target = self.win.targetAt(self.win.getMouse())
+        if target is self.quit:
+            self.leave()
             return False
-        if self.play.wasClicked(click):
-            self.win.close()
+        if target is self.play:
+            self.leave()
             return True
         else:
-            self.close()
+            return self.close()
 
 
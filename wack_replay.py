@@ -0,0 +1,102 @@
+import random
+import struct
+from graphics import clock, setBackend
+from wack_engine import UniformSampler, WackEngine
+from wack_interface import GameInterface
+
+# Session log format, all little-endian:
+#   header: b'WACK', format version (byte), RNG seed (uint64),
+#           heads (byte), politician fields joined by tabs (uint16
+#           length, then that many bytes of UTF-8)
+#   then one record per click: seconds since the game window opened
+#           (double), canvas x and y (int16), mouse button (byte)
+MAGIC = b'WACK'
+VERSION = 1
+HEADER = struct.Struct('<4sBQBH')
+CLICK = struct.Struct('<dhhB')
+
+
+def new_engine(seed, heads):
+    """
+    Makes the engine a session log describes: the same heads and
+    sequence of holes for a given seed.
+    :return: WackEngine
+    """
+    return WackEngine(UniformSampler(random.Random(seed)), heads=heads)
+
+
+def record_game(politician, filename, seed=None, heads=1, game=None):
+    """
+    Plays a game, logging every click in the game window and the seed
+    the head spots are drawn from to filename.
+    :param politician: politician tuple, as from select_politician
+    :param filename: log file to write
+    :param seed: RNG seed, a random one if not given
+    :param heads: most heads up at once
+    :param game: GameInterface to play on, reset for the logged game;
+            one in its own window if not given
+    :return: score: total score through the game
+             level: last level played
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    name = '\t'.join(politician).encode('utf-8')
+    with open(filename, 'wb') as log:
+        log.write(HEADER.pack(MAGIC, VERSION, seed, heads, len(name)) + name)
+        if game:
+            game.reset(new_engine(seed, heads))
+        else:
+            game = GameInterface(politician, new_engine(seed, heads))
+        start_time = clock()
+
+        def log_click(x, y, button):
+            log.write(CLICK.pack(clock() - start_time, int(x), int(y), button))
+
+        game.win.setClickListener(log_click)
+        try:
+            game.start()
+            return game.play()
+        finally:
+            game.win.setClickListener(None)
+
+
+def read_log(filename):
+    """
+    :return: politician: politician tuple
+             seed: RNG seed
+             heads: most heads up at once
+             clicks: list of (seconds, x, y, button) tuples
+    """
+    with open(filename, 'rb') as log:
+        data = log.read()
+    magic, version, seed, heads, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a version {} session log: {}'.format(VERSION, filename))
+    start = HEADER.size + length
+    politician = tuple(data[HEADER.size:start].decode('utf-8').split('\t'))
+    clicks = [CLICK.unpack_from(data, offset) for offset in range(start, len(data), CLICK.size)]
+    return politician, seed, heads, clicks
+
+
+def replay_game(filename, fast=False):
+    """
+    Plays a logged game again, feeding the logged clicks to the game
+    window at the times they were made. At original speed this takes
+    as long as the game did and shows it; fast replays switch to the
+    headless backend, whose virtual clock runs the same timeline
+    without waiting or drawing anything. Clicks made within a few
+    milliseconds of a head timing out may land on the other side of
+    it, since real timers fire a little late.
+    :param filename: log written by record_game
+    :param fast: True to replay as fast as possible
+    :return: score: total score through the game
+             level: last level played
+    """
+    politician, seed, heads, clicks = read_log(filename)
+    if fast:
+        setBackend('headless')
+    game = GameInterface(politician, new_engine(seed, heads))
+    for seconds, x, y, button in clicks:
+        game.win.after(round(seconds * 1000), game.win.injectClick, x, y, button)
+    game.start()
+    return game.play()
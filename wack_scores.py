@@ -0,0 +1,235 @@
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+
+# High scores, kept in an SQLite database next to the game
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCORES_FILE = os.path.join(HERE, 'scores.db')
+MAX_AGE = 90 * 24 * 60 * 60  # seconds; compact() drops games older than this...
+KEEP = 100  # ...unless they are among this many best for their key
+BUSY_TIMEOUT = 30  # seconds a write waits for other processes' writes
+READ_TIMEOUT = 0.05  # seconds a query waits before giving up
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    politician TEXT NOT NULL,
+    manner TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (politician, manner, score);
+CREATE INDEX IF NOT EXISTS scores_by_level ON scores (politician, manner, level, score);
+CREATE INDEX IF NOT EXISTS scores_by_time ON scores (time);
+'''
+
+COMPACT = '''
+DELETE FROM scores WHERE time < ? AND id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (PARTITION BY politician, manner, level
+                                      ORDER BY score DESC) AS rank
+        FROM scores)
+    WHERE rank <= ?)
+'''
+
+
+def connect(filename):
+    """
+    Opens the database, making the table and indexes if they are not
+    there yet. Write-ahead logging lets any number of processes read
+    while one writes, and writers queue up for up to BUSY_TIMEOUT.
+    :return: sqlite3 connection
+    """
+    connection = sqlite3.connect(filename, timeout=BUSY_TIMEOUT)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def connect_reader(filename):
+    """
+    Opens the database read-only. With write-ahead logging a reader
+    never waits for writers, and it gives up after READ_TIMEOUT rather
+    than BUSY_TIMEOUT if the file is locked some other way.
+    :return: sqlite3 connection
+    """
+    uri = pathlib.Path(filename).resolve().as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True, timeout=READ_TIMEOUT)
+
+
+class ScoreStore:
+    """
+    High scores of finished games, keyed by politician name, manner
+    of playing ('play' or 'sim') and the level the game ended on.
+
+    add() only queues a score and returns at once; a writer thread
+    saves everything queued so far in one transaction, so a game never
+    waits on the disk or on other processes writing the same file.
+    Queries read whatever has been saved so far and never wait for the
+    writer; rank() puts a game that may not be saved yet among them.
+    If saving fails, say because another process held the file for
+    longer than BUSY_TIMEOUT, that batch is dropped and the error kept
+    in self.error.
+    """
+    def __init__(self, filename=SCORES_FILE):
+        """
+        :param filename: database file, made if it does not exist
+        """
+        self.filename = filename
+        connect(filename).close()
+        self.reader = None
+        self.error = None  # last error saving scores, if any
+        self.last = None  # row of the last game added
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.write_queued, name='ScoreStore writer')
+        self.writer.daemon = True
+        self.writer.start()
+
+    def add(self, politician, manner, score, level):
+        """
+        Queues the result of a finished game to be saved.
+        :param politician: politician name
+        :param manner: 'play' or 'sim'
+        :param score: total score through the game
+        :param level: last level played
+        """
+        self.last = (politician, manner, level, score, time.time())
+        self.queue.put(('add', self.last))
+
+    def compact(self, max_age=MAX_AGE, keep=KEEP):
+        """
+        Queues deleting games older than max_age seconds, except the
+        keep best scores of each politician, manner and level.
+        """
+        self.queue.put(('compact', (time.time() - max_age, keep)))
+
+    def flush(self, timeout=None):
+        """
+        Waits until everything queued so far has been saved, or until
+        timeout seconds have passed. Not for use while a game is up,
+        since the writer may itself be waiting up to BUSY_TIMEOUT.
+        :param timeout: seconds to wait at most, or None for no limit
+        :return: True if everything was saved, False if the time ran
+                 out or the writer thread has stopped
+        """
+        if not self.writer.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        Saves everything queued and stops the writer thread.
+        """
+        self.queue.put(('close', None))
+        self.writer.join()
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
+    def write_queued(self):
+        """
+        Writer thread: takes whatever has been queued, saves it in one
+        transaction, and repeats until closed.
+        """
+        connection = connect(self.filename)
+        closing = False
+        while not closing:
+            jobs = [self.queue.get()]
+            while True:
+                try:
+                    jobs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [value for kind, value in jobs if kind == 'add']
+            try:
+                with connection:
+                    connection.executemany('INSERT INTO scores (politician, manner, level, score, time) '
+                                           'VALUES (?, ?, ?, ?, ?)', rows)
+                    for kind, value in jobs:
+                        if kind == 'compact':
+                            connection.execute(COMPACT, value)
+            except sqlite3.Error as error:
+                self.error = error  # those scores are lost, but the game goes on
+            finally:
+                # even if the thread is dying, nobody is left waiting on it
+                for kind, value in jobs:
+                    if kind == 'flush':
+                        value.set()
+                    elif kind == 'close':
+                        closing = True
+        connection.close()
+
+    def query(self, sql, values):
+        """
+        Runs a query on the games saved so far, without waiting for
+        the queued ones.
+        :return: list of result rows
+        """
+        if self.reader is None:
+            self.reader = connect_reader(self.filename)
+        return self.reader.execute(sql, values).fetchall()
+
+    def top(self, politician, manner, n=10, level=None):
+        """
+        :param level: only count games that ended on this level, if given
+        :return: list of the n best (score, level, time) results, best
+                 first, time being when the game was saved (time.time())
+        """
+        if level is None:
+            return self.query('SELECT score, level, time FROM scores WHERE politician = ? AND manner = ? '
+                              'ORDER BY score DESC LIMIT ?', (politician, manner, n))
+        return self.query('SELECT score, level, time FROM scores WHERE politician = ? AND manner = ? '
+                          'AND level = ? ORDER BY score DESC LIMIT ?', (politician, manner, level, n))
+
+    def percentile(self, politician, manner, score, level=None, exclude=None):
+        """
+        :param score: score to rank
+        :param level: only count games that ended on this level, if given
+        :param exclude: time of a saved game to leave out, if given
+        :return: percentage of the saved games that scored less than
+                 score, or None if there are none
+        """
+        where = 'politician = ? AND manner = ?'
+        values = (politician, manner)
+        if level is not None:
+            where += ' AND level = ?'
+            values += (level,)
+        if exclude is not None:
+            where += ' AND time != ?'
+            values += (exclude,)
+        (below, total), = self.query('SELECT COUNT(CASE WHEN score < ? THEN 1 END), COUNT(*) FROM scores '
+                                     'WHERE ' + where, (score,) + values)
+        if not total:
+            return None
+        return 100 * below / total
+
+    def rank(self, politician, manner, score):
+        """
+        Ranks a game that has just finished against the other saved
+        games. If it is the game last added, it is left out of the
+        count whether or not the writer has saved it yet, so the
+        answer does not depend on the writer. Safe to call while a
+        screen is up: it never waits on the writer, and gives up if
+        the file cannot be read within READ_TIMEOUT.
+        :param score: score the game ended with
+        :return: (percentage of the other games that scored less, or
+                 None if there are none, best score including this
+                 one), or None if the database could not be read
+        """
+        last = self.last
+        exclude = None
+        if last and last[:2] == (politician, manner) and last[3] == score:
+            exclude = last[4]
+        try:
+            percent = self.percentile(politician, manner, score, exclude=exclude)
+            best = self.top(politician, manner, 1)
+        except sqlite3.Error as error:
+            self.error = error
+            return None
+        return percent, max([score] + [row[0] for row in best])